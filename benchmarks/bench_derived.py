@@ -0,0 +1,53 @@
+"""Derived columns: per-row ``apply`` vs the vectorized engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_derived --rows 100000 1000000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_frame
+from services.config import PASS_MARK
+from services.derived import DERIVED_COLUMNS, add_derived_columns
+
+
+def apply_result(df: pd.DataFrame) -> pd.DataFrame:
+    # The pass/fail path streamlit_app.py used before the engine existed.
+    df = df.copy()
+    df["result"] = df["overall_grade"].apply(
+        lambda x: "Pass" if pd.notna(x) and x >= PASS_MARK else "Fail"
+    )
+    return df
+
+
+def best_of(fn, df, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    result_only = [c for c in DERIVED_COLUMNS if c.name == "result"]
+    print(f"{'rows':>10}{'apply ms':>12}{'result ms':>12}{'speedup':>10}{'all 3 ms':>12}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        assert (apply_result(df)["result"] == add_derived_columns(df, result_only)["result"]).all()
+        apply_ms = best_of(apply_result, df, args.repeat)
+        vector_ms = best_of(lambda d: add_derived_columns(d, result_only), df, args.repeat)
+        all_ms = best_of(add_derived_columns, df, args.repeat)
+        print(f"{rows:>10,}{apply_ms:>12.1f}{vector_ms:>12.1f}{apply_ms / vector_ms:>9.0f}x{all_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""End-to-end timings from workbook to figure, at several dataset sizes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_end_to_end --rows 1000 100000 1000000
+
+For each size a synthetic workbook is generated (reused from
+``--workbook-dir`` when present) and pushed through the same calls the app
+makes:
+
+    ingest          iter_student_excel -> db_upload (parse, load, indexes, summary, snapshot)
+    get_all_data    db_get_all_data, cold (process cache cleared) and warm
+    get_student     db_get_student p50/p95, record cache bypassed
+    kpis            db_get_summary + kpis()/departments(), cold
+    groupby         department_breakdown over the loaded frame
+    figures         Overview figures built and serialized with to_json()
+    ingest_delta    a correction file (``--delta`` changed rows) upserted into the table
+
+Each stage appends one JSON line to ``--out`` (default
+``bench_results.jsonl``) tagged with the run id, git commit and row count,
+so results can be compared across commits. The database lives in a
+temporary directory; ``saveetha.db`` is never touched.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+from benchmarks.synthetic import write_workbook
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def seconds(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def percentiles(samples_ms) -> dict:
+    samples_ms = sorted(samples_ms)
+    return {
+        "p50_ms": round(statistics.median(samples_ms), 4),
+        "p95_ms": round(samples_ms[max(int(len(samples_ms) * 0.95) - 1, 0)], 4),
+    }
+
+
+def overview_figures(database, table: str) -> list:
+    # The Overview tab's figures, built from the same aggregates.
+    summary = database.db_get_summary(table)
+    counts, edges = database.db_get_histogram(table, "overall_grade", 20)
+    figures = [go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=edges[1] - edges[0]))]
+    depts = summary.departments()
+    figures.append(px.bar(depts, x="overall_grade", y="department", orientation="h",
+                          color="overall_grade"))
+    figures.append(px.pie(depts, names="department", values="passed", hole=0.45))
+    for column in summary.exam_means().index:
+        counts, edges = database.db_get_histogram(table, column, 15)
+        figures.append(go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts)))
+    return figures
+
+
+def run_size(database, rows: int, workbook: str, lookups: int, delta: int) -> list:
+    from services.analytics import department_breakdown
+    from services.excel_processor import iter_student_excel
+
+    table = f"bench_{rows}"
+    results = []
+
+    def record(stage, elapsed, **extra):
+        results.append({"stage": stage, "seconds": round(elapsed, 6), **extra})
+        print(f"{rows:>10,}  {stage:<18}{elapsed * 1000:>12.1f} ms  "
+              + "  ".join(f"{k}={v}" for k, v in extra.items()))
+
+    with open(workbook, "rb") as f:
+        elapsed, report = seconds(lambda: database.db_upload(iter_student_excel(f), table))
+    record("ingest", elapsed, rows_per_sec=round(report.rows / elapsed))
+
+    database.dataset_cache.clear()
+    elapsed, df = seconds(lambda: database.db_get_all_data(table))
+    record("get_all_data_cold", elapsed, mem_mb=round(df.memory_usage(deep=True).sum() / 2**20, 1))
+    elapsed, _ = seconds(lambda: database.db_get_all_data(table))
+    record("get_all_data_warm", elapsed)
+
+    rolls = [f"21CS{random.randrange(rows):07d}" for _ in range(lookups)]
+    samples = []
+    for roll in rolls:
+        database._lookup_student.cache_clear()
+        elapsed, student = seconds(lambda: database.db_get_student(table, roll))
+        assert student is not None
+        samples.append(elapsed * 1000)
+    record("get_student", sum(samples) / 1000, lookups=lookups, **percentiles(samples))
+
+    database.dataset_cache.clear()
+
+    def kpis():
+        summary = database.db_get_summary(table)
+        return summary.kpis(), summary.departments()
+
+    elapsed, _ = seconds(kpis)
+    record("kpis", elapsed)
+
+    elapsed, _ = seconds(lambda: department_breakdown(df))
+    record("groupby", elapsed)
+
+    database.dataset_cache.clear()
+    elapsed, figures = seconds(lambda: [fig.to_json() for fig in overview_figures(database, table)])
+    record("figures", elapsed, figures=len(figures), json_kb=round(sum(map(len, figures)) / 1024, 1))
+
+    correction = df.sample(min(delta, rows), random_state=0).astype(object)
+    correction["overall_grade"] = [round(random.uniform(0, 100), 2) for _ in range(len(correction))]
+    elapsed, report = seconds(lambda: database.db_upload(correction, table))
+    record("ingest_delta", elapsed, rows=report.rows, incremental=report.incremental)
+
+    database.db_delete_table(table)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--delta", type=int, default=200, help="rows in the correction file")
+    parser.add_argument("--workbook-dir", default=None,
+                        help="keep generated workbooks here and reuse them across runs")
+    parser.add_argument("--out", default="bench_results.jsonl", help="JSON Lines results file")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out)
+    workbook_dir = os.path.abspath(args.workbook_dir or tempfile.mkdtemp(prefix="saveetha_wb_"))
+    os.makedirs(workbook_dir, exist_ok=True)
+    os.chdir(tempfile.mkdtemp(prefix="saveetha_bench_"))
+    from services import database
+
+    run = {
+        "run_id": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    for rows in args.rows:
+        workbook = os.path.join(workbook_dir, f"synthetic_{rows}.xlsx")
+        if not os.path.exists(workbook):
+            elapsed, _ = seconds(lambda: write_workbook(workbook, rows))
+            print(f"{rows:>10,}  generated workbook in {elapsed:.1f}s")
+        results = run_size(database, rows, workbook, args.lookups, args.delta)
+        with open(out, "a") as f:
+            for result in results:
+                f.write(json.dumps({**run, "rows": rows, **result}) + "\n")
+    print(f"\nresults appended to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Analytical queries on the SQLite and DuckDB engines, on the same datasets.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_engines --rows 100000 1000000
+
+For each size one synthetic table is uploaded, then every query is run on
+both engines (``--repeat`` runs, median reported) and the results are
+checked to be identical:
+
+    kpis            summary aggregates (overall, per department, per exam)
+    histogram       overall_grade bin counts
+    groupby         per-department histograms + top 3 (department breakdown)
+    ranking         top 10 per department (ROW_NUMBER window)
+
+DuckDB reads the table's Arrow snapshot, which uploads already keep; the
+database lives in a temporary directory. Each result is appended as a JSON
+line to ``--out`` (default ``bench_results.jsonl``).
+
+Median ms on a 1-vCPU x86_64 container (Python 3.11, SQLite 3.40, DuckDB 1.5),
+identical results on both engines for every query:
+
+    rows        query        sqlite    duckdb
+    100,000     kpis          222.7      47.4
+    100,000     histogram      55.0      17.8
+    100,000     groupby       575.6     121.5
+    100,000     ranking       372.5      77.7
+    1,000,000   kpis         2407.2     318.0
+    1,000,000   histogram     562.0     112.6
+    1,000,000   groupby      6030.5    1091.9
+    1,000,000   ranking      4019.1     777.1
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_end_to_end import git_commit
+from benchmarks.synthetic import make_frame
+
+ENGINE_NAMES = ["sqlite", "duckdb"]
+
+
+def queries(database, table: str, columns: list):
+    from services.analytics import sql_department_breakdown, sql_top_students
+    from services.histograms import sql_bin_counts
+    from services.summary import build_summary, read_summary
+
+    def kpis(conn, engine):
+        build_summary(conn, table, columns, engine)
+        return read_summary(conn, table).frame.drop(columns="label")
+
+    return {
+        "kpis": kpis,
+        "histogram": lambda conn, engine: sql_bin_counts(conn, table, "overall_grade", 20, engine),
+        "groupby": lambda conn, engine: sql_department_breakdown(conn, table, columns, engine),
+        "ranking": lambda conn, engine: sql_top_students(conn, table, columns, engine, 10),
+    }
+
+
+def same(a, b) -> bool:
+    if isinstance(a, tuple):
+        return all(same(x, y) for x, y in zip(a, b))
+    if hasattr(a, "counts") and hasattr(a, "top"):
+        return a.departments == b.departments and same(a.counts, b.counts) and same(a.top, b.top)
+    if hasattr(a, "select_dtypes"):
+        numeric = a.select_dtypes("number").columns
+        return (a.drop(columns=numeric).equals(b.drop(columns=numeric))
+                and np.allclose(a[numeric].astype(float).fillna(-1), b[numeric].astype(float).fillna(-1)))
+    return np.allclose(a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default="bench_results.jsonl", help="JSON Lines results file")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out)
+    os.chdir(tempfile.mkdtemp(prefix="saveetha_bench_"))
+    from services import database
+    from services.backends import duckdb_available, get_engine
+
+    if not duckdb_available():
+        parser.error("DuckDB engine unavailable (pip install -r requirements-duckdb.txt)")
+    engines = {name: get_engine(name) for name in ENGINE_NAMES}
+    commit = git_commit()
+
+    print(f"{'rows':>10}  {'query':<10}" + "".join(f"{name:>10}" for name in ENGINE_NAMES) + "  same")
+    for rows in args.rows:
+        table = f"bench_{rows}"
+        df = make_frame(rows)
+        database.db_upload(df, table)
+        for query, run in queries(database, table, list(df.columns)).items():
+            medians, results = {}, {}
+            for name, engine in engines.items():
+                samples = []
+                with database.engine.begin() as conn:
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        results[name] = run(conn, engine)
+                        samples.append((time.perf_counter() - start) * 1000)
+                medians[name] = statistics.median(samples)
+            identical = same(results["sqlite"], results["duckdb"])
+            print(f"{rows:>10,}  {query:<10}" + "".join(f"{medians[n]:>10.1f}" for n in ENGINE_NAMES)
+                  + f"  {'yes' if identical else 'NO'}")
+            with open(out, "a") as f:
+                for name in ENGINE_NAMES:
+                    f.write(json.dumps({"bench": "engines", "commit": commit, "rows": rows,
+                                        "query": query, "engine": name,
+                                        "median_ms": round(medians[name], 3),
+                                        "identical": identical}) + "\n")
+        database.db_delete_table(table)
+    print(f"\nresults appended to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Search-as-you-type latency for ``db_search_students``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_search --rows 500000
+
+The database is built in a temporary directory, so ``saveetha.db`` is never
+touched. Each query is timed over ``--repeat`` runs (best run reported),
+from roll-number prefixes through partial names to typos.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import make_frame
+
+QUERIES = [
+    "21", "21CS0004", "21cs00042", "0424", "424242", "19210000012",
+    "Stu", "Student", "Student 3", "Student 4242", "tudent 99999",
+    "Stuednt 424", "Studnet 424242", "student 21cs0424242", "xyz",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="saveetha_bench_"))
+    from services import database
+
+    table = "bench_search"
+    start = time.perf_counter()
+    database.db_upload(make_frame(args.rows), table)
+    print(f"upload {args.rows:,} rows (incl. search index): {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'query':<24}{'best ms':>10}{'hits':>6}  top hit")
+    for query in QUERIES:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            hits = database.db_search_students(table, query)
+            times.append((time.perf_counter() - start) * 1000)
+        top = f"{hits[0]['roll_no_']} / {hits[0]['student_name']}" if hits else "—"
+        print(f"{query!r:<24}{min(times):>10.2f}{len(hits):>6}  {top}")
+
+
+if __name__ == "__main__":
+    main()
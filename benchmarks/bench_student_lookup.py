@@ -0,0 +1,73 @@
+"""Roll-number lookup latency for ``db_get_student``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_student_lookup --rows 500000
+
+The database is built in a temporary directory, so ``saveetha.db`` is never
+touched. Three paths are timed: a full scan (index dropped), an indexed
+lookup with the record cache bypassed, and a repeated lookup served from the
+record cache.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import make_frame
+
+
+def timed(fn, rolls):
+    samples = []
+    for roll in rolls:
+        start = time.perf_counter()
+        assert fn(roll) is not None
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="saveetha_bench_"))
+    from services import database
+    from sqlalchemy import text
+
+    table = "bench_lookup"
+    start = time.perf_counter()
+    database.db_upload(make_frame(args.rows), table)
+    print(f"upload {args.rows:,} rows: {time.perf_counter() - start:.2f}s")
+
+    rolls = [f"21CS{random.randrange(args.rows):07d}" for _ in range(args.lookups)]
+
+    def uncached(roll):
+        database._lookup_student.cache_clear()
+        return database.db_get_student(table, roll)
+
+    indexed = timed(uncached, rolls)
+    cached = timed(lambda roll: database.db_get_student(table, roll), rolls[:50] * 20)
+
+    with database.engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX [ix_{table}_roll_no_]"))
+    # Indexes are checked once per table generation, so the lookup path
+    # does not rebuild it.
+    scan = timed(uncached, rolls[:20])
+
+    print(f"{'path':<22}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, result in [("full scan (no index)", scan), ("indexed", indexed),
+                         ("indexed + LRU hit", cached)]:
+        print(f"{name:<22}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['mean_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
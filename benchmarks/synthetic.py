@@ -0,0 +1,74 @@
+"""Synthetic student frames shaped like a processed upload, and workbooks
+in the two-row header format the uploader expects:
+
+    python -m benchmarks.synthetic exports/synthetic_100k.xlsx --rows 100000
+"""
+import numpy as np
+import pandas as pd
+
+DEPARTMENTS = ["CSE", "ECE", "MECH", "IT", "EEE", "CIVIL"]
+
+
+def make_frame(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    q = rng.integers(20, 101, size=(rows, 3))
+    return pd.DataFrame({
+        "s_no": np.arange(1, rows + 1),
+        "student_name": [f"Student {i}" for i in range(rows)],
+        "roll_no_": [f"21CS{i:07d}" for i in range(rows)],
+        "register_no_": [f"1921{i:08d}" for i in range(rows)],
+        "department": rng.choice(DEPARTMENTS, rows),
+        "year": rng.choice(["I", "II", "III", "IV"], rows),
+        "course": "Python",
+        "grade_q1": q[:, 0], "grade_q2": q[:, 1], "grade_q3": q[:, 2],
+        "overall_grade": q.mean(axis=1).round(2),
+    })
+
+
+# Two-row header exactly as the exports have it: "Grade" is merged over
+# Q1/Q2/Q3 and every other title is merged down over both rows.
+WORKBOOK_HEADER = [
+    ("S.No", "s_no"), ("Student Name", "student_name"), ("Roll No.", "roll_no_"),
+    ("Register No.", "register_no_"), ("Department", "department"), ("Year", "year"),
+    ("Course", "course"), ("Grade", "grade_q1"), (None, "grade_q2"), (None, "grade_q3"),
+    ("Overall Grade /300", "overall_grade"),
+]
+WORKBOOK_SUBHEADER = [None] * 7 + ["Q1 /100", "Q2 /100", "Q3 /100", None]
+
+
+def write_workbook(path, rows: int, seed: int = 7, df: pd.DataFrame = None):
+    """Write ``make_frame(rows)`` as an .xlsx in the upload format.
+
+    Uses openpyxl's write-only mode, so even 1M-row workbooks are streamed
+    to disk. Returns the frame that was written.
+    """
+    from openpyxl import Workbook
+
+    df = make_frame(rows, seed) if df is None else df
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Students")
+    ws.append([title for title, _ in WORKBOOK_HEADER])
+    ws.append(WORKBOOK_SUBHEADER)
+    for i, (title, _) in enumerate(WORKBOOK_HEADER):
+        letter = chr(ord("A") + i)
+        if title not in ("Grade", None):
+            ws.merged_cells.add(f"{letter}1:{letter}2")
+    ws.merged_cells.add("H1:J1")
+
+    columns = [df[name].tolist() for _, name in WORKBOOK_HEADER]
+    for row in zip(*columns):
+        ws.append(row)
+    wb.save(path)
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic student workbook.")
+    parser.add_argument("path", help="output .xlsx")
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    write_workbook(args.path, args.rows, args.seed)
+    print(f"wrote {args.rows:,} students to {args.path}")
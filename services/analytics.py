@@ -0,0 +1,95 @@
+"""Grouped statistics, from a loaded dataset or in SQL over the stored table."""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class DepartmentBreakdown:
+    departments: list      # sorted department names
+    edges: np.ndarray      # shared histogram bin edges
+    counts: pd.DataFrame   # department x bin -> students
+    top: pd.DataFrame      # up to ``top_n`` best students per department
+
+
+def department_breakdown(df: pd.DataFrame, nbins: int = 15, top_n: int = 3) -> DepartmentBreakdown:
+    """Per-department grade histograms and top students in one pass.
+
+    Every row is assigned to a bin of a common set of edges once, then a
+    single groupby counts (department, bin) pairs; the winners come from
+    ``nlargest`` per group instead of sorting each department slice.
+    """
+    df = df[df["department"].notna()]
+    grades = df["overall_grade"].to_numpy(dtype="float64")
+    graded = ~np.isnan(grades)
+
+    if graded.any():
+        edges = np.histogram_bin_edges(grades[graded], bins=nbins)
+    else:
+        edges = np.linspace(0, 1, nbins + 1)
+    bins = np.clip(np.searchsorted(edges, grades, side="right") - 1, 0, nbins - 1)
+
+    # Factorize once; both the counts and the winners group on int codes.
+    codes, departments = pd.factorize(df["department"], sort=True)
+    departments = list(departments)
+    flat = np.bincount(codes[graded] * nbins + bins[graded], minlength=len(departments) * nbins)
+    counts = pd.DataFrame(flat.reshape(len(departments), nbins), index=departments)
+
+    winners = (
+        pd.Series(grades, index=df.index).groupby(codes)
+        .nlargest(top_n).index.get_level_values(-1)
+    )
+    top = df.loc[winners]
+
+    return DepartmentBreakdown(departments, edges, counts, top)
+
+
+def sql_department_breakdown(conn, table_name: str, columns, engine,
+                             nbins: int = 15, top_n: int = 3, top=None) -> DepartmentBreakdown:
+    """``department_breakdown`` run by a query engine (services.backends).
+
+    One GROUP BY counts (department, bin) pairs; the winners are ``top``
+    when given (e.g. from the rank index), else ``sql_top_students``.
+    """
+    def query(sql, params=()):
+        return engine.query(conn, table_name, sql, params)
+
+    graded = "department IS NOT NULL AND overall_grade IS NOT NULL"
+    departments = [row[0] for row in query(
+        "SELECT DISTINCT department FROM {t} WHERE department IS NOT NULL ORDER BY 1"
+    )]
+    counts = pd.DataFrame(0, index=departments, columns=range(nbins), dtype="int64")
+
+    low, high = query(f"SELECT MIN(overall_grade), MAX(overall_grade) FROM {{t}} WHERE {graded}")[0]
+    if low is None:
+        edges = np.linspace(0, 1, nbins + 1)
+    else:
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, nbins + 1)
+        bin_expr = engine.trunc("(overall_grade - ?) / ?")
+        for dept, bin_index, n in query(
+            f"SELECT department, {bin_expr} AS bin, COUNT(*) FROM {{t}} "
+            f"WHERE {graded} GROUP BY department, bin", (low, (high - low) / nbins),
+        ):
+            counts.loc[dept, min(int(bin_index), nbins - 1)] += n
+
+    if top is None:
+        top = sql_top_students(conn, table_name, columns, engine, top_n)
+    return DepartmentBreakdown(departments, edges, counts, top)
+
+
+def sql_top_students(conn, table_name: str, columns, engine, top_n: int = 3) -> pd.DataFrame:
+    """Each department's ``top_n`` students by overall grade, best first.
+
+    Ranked with a ``ROW_NUMBER()`` window; ties go to the lower roll number.
+    """
+    shown = ["department"] + [c for c in ("student_name",) if c in columns] + ["overall_grade"]
+    order = "overall_grade DESC" + (", roll_no_" if "roll_no_" in columns else "")
+    return pd.DataFrame(engine.query(conn, table_name, (
+        f"SELECT {', '.join(shown)} FROM ("
+        f"SELECT {', '.join(shown)}, ROW_NUMBER() OVER (PARTITION BY department ORDER BY {order}) AS r "
+        "FROM {t} WHERE department IS NOT NULL AND overall_grade IS NOT NULL"
+        ") ranked WHERE r <= ? ORDER BY department, r"
+    ), (top_n,)), columns=shown)
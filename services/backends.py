@@ -0,0 +1,98 @@
+"""Query engines for the analytical SQL behind the ``db_*`` helpers.
+
+SQLite holds every table and is the default engine. With
+``SAVEETHA_ENGINE=duckdb`` the scan-heavy queries (summary KPIs, histogram
+bins, the department groupby and per-department rankings) run in an
+embedded DuckDB instead, vectorized over the table's memory-mapped Arrow
+snapshot (see services.snapshots); a stale snapshot is rewritten from
+SQLite first. DuckDB is optional: without it, or without pyarrow, the
+SQLite engine is used.
+
+Queries are written once, in SQL both engines accept: ``{t}`` stands for
+the table, ``?`` for a parameter, ``engine.trunc(expr)`` truncates to an
+integer (``CAST`` truncates in SQLite but rounds in DuckDB) and
+``engine.in_order`` orders rows as stored.
+"""
+import threading
+
+from services.config import ANALYTICS_ENGINE
+from services.schema import load_schema
+from services.snapshots import open_snapshot, snapshots_enabled, write_snapshot
+from services.versions import database_id, get_version
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - optional dependency
+    duckdb = None
+
+
+class SQLiteEngine:
+    name = "sqlite"
+    in_order = "ORDER BY rowid"
+
+    def trunc(self, expr: str) -> str:
+        return f"CAST({expr} AS INTEGER)"
+
+    def query(self, conn, table_name: str, sql: str, params=()) -> list:
+        return conn.exec_driver_sql(sql.format(t=f'"{table_name}"'), tuple(params)).fetchall()
+
+
+class DuckDBEngine:
+    name = "duckdb"
+    # Snapshots are written in rowid order and DuckDB preserves insertion order.
+    in_order = ""
+
+    def __init__(self):
+        self._db = duckdb.connect()
+        self._local = threading.local()
+
+    def trunc(self, expr: str) -> str:
+        return f"CAST(trunc({expr}) AS INTEGER)"
+
+    def query(self, conn, table_name: str, sql: str, params=()) -> list:
+        cursor = self._cursor()
+        cursor.register("__t", self._snapshot(conn, table_name))
+        try:
+            return cursor.execute(sql.format(t="__t"), list(params)).fetchall()
+        finally:
+            cursor.unregister("__t")
+
+    def _cursor(self):
+        # A DuckDB connection is not thread-safe; each thread gets its own cursor.
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self._db.cursor()
+        return cursor
+
+    def _snapshot(self, conn, table_name: str):
+        version, database = get_version(conn, table_name), database_id(conn)
+        table = open_snapshot(table_name, version, database)
+        if table is None:
+            # ``conn`` sees the rows of an upload still in progress as well.
+            write_snapshot(conn, table_name, load_schema(conn, table_name), version)
+            table = open_snapshot(table_name, version, database)
+        return table
+
+
+ENGINES = {"sqlite": SQLiteEngine, "duckdb": DuckDBEngine}
+
+_lock = threading.Lock()
+_engines = {}
+
+
+def duckdb_available() -> bool:
+    return duckdb is not None and snapshots_enabled()
+
+
+def get_engine(name: str = None):
+    """The engine called ``name`` (default: ``SAVEETHA_ENGINE``), shared per process.
+
+    Falls back to SQLite for unknown names and when DuckDB cannot run.
+    """
+    name = (name or ANALYTICS_ENGINE).lower()
+    if name not in ENGINES or (name == "duckdb" and not duckdb_available()):
+        name = "sqlite"
+    with _lock:
+        if name not in _engines:
+            _engines[name] = ENGINES[name]()
+        return _engines[name]
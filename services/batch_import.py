@@ -0,0 +1,168 @@
+"""Parallel import of many workbooks into one table.
+
+Workbooks are parsed in a process pool (openpyxl parsing is CPU-bound and
+holds the GIL), each through the same header normalization as a single
+upload. The parsed frames are then written by one ``db_upload`` call, so
+the table gets a single bulk load and a single index/summary/snapshot
+refresh.
+
+Headless use:
+
+    python -m services.batch_import --table semester_2026 exports/*.xlsx
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+
+from services.excel_processor import iter_student_excel
+from services.header_rules import HeaderMapping
+from services.ledger import file_digest
+
+
+@dataclass
+class FileResult:
+    file_name: str
+    rows: int = 0
+    parse_seconds: float = 0.0
+    status: str = "parsed"          # parsed | skipped | failed
+    error: str = ""
+    header: Optional[HeaderMapping] = None
+
+
+@dataclass
+class BatchReport:
+    table_name: str
+    files: list = field(default_factory=list)
+    rows_written: int = 0
+    rows_unchanged: int = 0
+    load_seconds: float = 0.0
+    total_seconds: float = 0.0
+    error: Optional[str] = None
+    notes: list = field(default_factory=list)   # LoadReport.notes() of the load
+
+    def summary(self) -> str:
+        parsed = [f for f in self.files if f.status == "parsed"]
+        skipped = sum(f.status == "skipped" for f in self.files)
+        failed = sum(f.status == "failed" for f in self.files)
+        rows = sum(f.rows for f in parsed)
+        return (f"{len(parsed)} files, {rows} rows ({self.rows_written} written, "
+                f"{self.rows_unchanged} unchanged) in {self.total_seconds:.1f}s"
+                + (f", {skipped} skipped" if skipped else "")
+                + (f", {failed} failed" if failed else "")
+                + "".join(f" · {note}" for note in self.notes))
+
+    def table(self) -> pd.DataFrame:
+        return pd.DataFrame([{
+            "file": f.file_name, "status": f.status, "rows": f.rows,
+            "parse_s": round(f.parse_seconds, 2),
+            "header": f.header.signature if f.header else "",
+            "header_cached": f.header.cached if f.header else None,
+            "error": f.error,
+        } for f in self.files])
+
+    def header_decisions(self) -> dict:
+        """Column mapping per distinct header signature seen in the batch."""
+        return {f.header.signature: f.header.describe() for f in self.files if f.header}
+
+
+def _parse(data: bytes):
+    # Runs in a worker process.
+    start = time.perf_counter()
+    headers = []
+    frame = pd.concat(list(iter_student_excel(io.BytesIO(data), on_header=headers.append)),
+                      ignore_index=True)
+    return frame, time.perf_counter() - start, headers[0]
+
+
+def batch_import(files, table_name: str, workers: Optional[int] = None, on_file=None,
+                 progress=None) -> BatchReport:
+    """Import ``files`` (``(file_name, bytes)`` pairs) into ``table_name``.
+
+    ``on_file(FileResult)`` is called as each workbook finishes parsing and
+    ``progress(LoadReport)`` after each written batch.
+    """
+    from services.database import db_find_upload, db_record_upload, db_upload
+
+    start = time.perf_counter()
+    report = BatchReport(table_name)
+    # Keyed by content digest, not by name: files from different folders
+    # can share a name, and each must be parsed and recorded on its own.
+    results = {}
+    pending = []
+    for file_name, data in files:
+        digest = file_digest(io.BytesIO(data))
+        result = FileResult(file_name)
+        report.files.append(result)
+        if digest in results:
+            result.status = "skipped"
+            result.error = f"same content as {results[digest].file_name}"
+            continue
+        if db_find_upload(digest, table_name):
+            result.status = "skipped"
+            result.error = "already imported"
+            continue
+        results[digest] = result
+        pending.append((digest, data))
+
+    def parsed_frames(pool):
+        futures = {pool.submit(_parse, data): digest for digest, data in pending}
+        for future in as_completed(futures):
+            result = results[futures[future]]
+            try:
+                frame, result.parse_seconds, result.header = future.result()
+            except Exception as e:
+                result.status, result.error = "failed", str(e)
+            else:
+                result.rows = len(frame)
+            if on_file:
+                on_file(result)
+            if result.status == "parsed":
+                yield frame
+
+    if pending:
+        # spawn: never fork a process that is running Streamlit's threads.
+        context = multiprocessing.get_context("spawn")
+        workers = workers or min(len(pending), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            load = db_upload(parsed_frames(pool), table_name, progress=progress)
+        report.rows_written = load.written
+        report.rows_unchanged = load.unchanged
+        report.load_seconds = load.seconds
+        report.notes = load.notes()
+        for digest, result in results.items():
+            if result.status == "parsed":
+                db_record_upload(digest, table_name, result.file_name, result.rows)
+
+    report.total_seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import many student workbooks into one table.")
+    parser.add_argument("files", nargs="+", help=".xlsx workbooks")
+    parser.add_argument("--table", required=True, help="target dataset (table) name")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPUs)")
+    args = parser.parse_args(argv)
+
+    files = []
+    for path in args.files:
+        with open(path, "rb") as f:
+            files.append((path, f.read()))
+
+    report = batch_import(files, args.table, workers=args.workers)
+    with pd.option_context("display.width", 120, "display.max_colwidth", 60):
+        print(report.table().to_string(index=False))
+    for signature, decisions in report.header_decisions().items():
+        print(f"\nheader {signature}: {decisions}")
+    print(f"\n{args.table}: {report.summary()} (load {report.load_seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Batch inserts for uploads.
+
+Each chunk is written with a single multi-row ``executemany`` inside its own
+transaction, bypassing ``DataFrame.to_sql`` and its per-chunk SQLAlchemy
+overhead.
+
+With an ``upsert_key`` (``roll_no_``), rows replace the stored row with the
+same key instead of being appended, and rows identical to what is already
+stored are not written at all.
+
+``on_delta(conn, delta)`` sees each batch's ``BatchDelta`` (rows inserted and
+the stored rows they replaced) inside the batch's transaction, so derived
+data can be kept in step with the table at O(batch) cost.
+
+A batch whose transaction fails with "database is locked" is rolled back
+and rerun with backoff (see services.write_lock).
+
+Column types come from the first chunk. A later chunk that does not fit
+them (text in a column that held numbers so far) widens the column before
+it is written, and columns the table lacks are added to it; the report
+lists both, and the values that were stored as NULL (non-numeric grades).
+Deltas do not cover added columns, so ``on_delta`` stops being called once
+one is added (``LoadReport.added``), and derived data must be rebuilt.
+"""
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from services.schema import (
+    add_columns, coerce_to_schema, infer_schema, retype_table, unparsed_values, widen_schema,
+)
+from services.write_lock import retry_locked
+
+
+@dataclass
+class LoadReport:
+    table_name: str
+    rows: int = 0          # rows read from the input
+    written: int = 0       # rows inserted (new or changed)
+    replaced: int = 0      # stored rows deleted because a changed row replaced them
+    unchanged: int = 0     # rows skipped because they were already stored as-is
+    batches: int = 0
+    seconds: float = 0.0
+    incremental: bool = False  # derived data updated from the deltas, not rebuilt
+    added: list = field(default_factory=list)     # columns added to the table
+    widened: dict = field(default_factory=dict)   # column -> type it was widened to
+    unparsed: dict = field(default_factory=dict)  # column -> values stored as NULL
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def notes(self) -> list:
+        """Column type changes and values that could not be stored as read."""
+        return ([f"new column {col} added" for col in self.added]
+                + [f"{col} now stored as {sql_type}" for col, sql_type in self.widened.items()]
+                + [f"{n} non-numeric {col} values left blank" for col, n in self.unparsed.items()])
+
+
+@dataclass
+class BatchDelta:
+    columns: list
+    added: list            # records inserted, in ``columns`` order
+    removed: list          # stored records they replaced
+    removed_rowids: list
+    first_rowid: int       # rowid of ``added[0]``; the rest follow consecutively
+
+
+def bulk_load(engine, table_name: str, schema: dict, chunks, upsert_key=None,
+              progress=None, on_delta=None) -> LoadReport:
+    """Write ``chunks``; ``progress(report)`` is called after every batch."""
+    columns = list(schema)
+    insert_sql = _insert_sql(table_name, columns)
+    if upsert_key not in columns:
+        upsert_key = None
+    report = LoadReport(table_name)
+    start = time.perf_counter()
+
+    for df in chunks:
+        new = {c: t for c, t in infer_schema(df).items() if c not in schema}
+        if new:
+            new = retry_locked(lambda: _add_columns(engine, table_name, schema, new))
+            schema = {**schema, **new}
+            columns = list(schema)
+            insert_sql = _insert_sql(table_name, columns)
+            report.added += list(new)
+            on_delta = None
+        wider = widen_schema(df, schema)
+        if wider != schema:
+            retry_locked(lambda: _retype(engine, table_name, schema, wider))
+            report.widened.update({c: t for c, t in wider.items() if schema[c] != t})
+            schema = wider
+        for col, n in unparsed_values(df, schema).items():
+            report.unparsed[col] = report.unparsed.get(col, 0) + n
+        df = coerce_to_schema(df.reindex(columns=columns), schema)
+        report.rows += len(df)
+        if upsert_key:
+            # Last occurrence wins when a file repeats a roll number.
+            keyed = df[upsert_key].notna()
+            df = pd.concat([df[keyed].drop_duplicates(upsert_key, keep="last"), df[~keyed]])
+        batch = _records(df)
+        if not batch:
+            continue
+
+        def write():
+            with engine.begin() as conn:
+                records, removed, removed_rowids = batch, [], []
+                if upsert_key:
+                    records, removed, removed_rowids = _upsert_prepare(
+                        conn, table_name, columns, upsert_key, batch
+                    )
+                first_rowid = None
+                if records:
+                    # A single insert into a rowid table appends after the current
+                    # maximum, so the batch's rows are one contiguous rowid range.
+                    first_rowid = conn.exec_driver_sql(
+                        f"SELECT COALESCE(MAX(rowid), 0) + 1 FROM [{table_name}]"
+                    ).scalar()
+                    conn.exec_driver_sql(insert_sql, records)
+                if on_delta and (records or removed):
+                    on_delta(conn, BatchDelta(columns, records, removed, removed_rowids, first_rowid))
+                return records, removed
+
+        records, removed = retry_locked(write)
+        report.written += len(records)
+        report.replaced += len(removed)
+        report.unchanged += len(batch) - len(records)
+        report.batches += 1
+        if progress:
+            report.seconds = time.perf_counter() - start
+            progress(report)
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def _insert_sql(table_name, columns) -> str:
+    return (
+        f"INSERT INTO [{table_name}] ({', '.join(f'[{c}]' for c in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+
+def _add_columns(engine, table_name, schema, new):
+    with engine.begin() as conn:
+        return add_columns(conn, table_name, schema, new)
+
+
+def _retype(engine, table_name, schema, new_schema):
+    with engine.begin() as conn:
+        retype_table(conn, table_name, schema, new_schema)
+
+
+# SQLite's default limit on bound parameters is 32766 (999 before 3.32).
+_IN_BATCH = 900
+
+
+def _upsert_prepare(conn, table_name, columns, key, records):
+    """Drop unchanged records and delete the stored rows the rest replace.
+
+    Returns ``(changed records, deleted rows, their rowids)``.
+    """
+    key_pos = columns.index(key)
+    keys = [r[key_pos] for r in records if r[key_pos] is not None]
+    select_cols = ", ".join(f"[{c}]" for c in columns)
+
+    stored = {}
+    for i in range(0, len(keys), _IN_BATCH):
+        batch = keys[i:i + _IN_BATCH]
+        rows = conn.exec_driver_sql(
+            f"SELECT rowid, {select_cols} FROM [{table_name}] "
+            f"WHERE [{key}] IN ({', '.join('?' for _ in batch)})",
+            tuple(batch),
+        ).fetchall()
+        for rowid, *row in rows:
+            stored.setdefault(row[key_pos], []).append((rowid, tuple(row)))
+
+    changed = []
+    for record in records:
+        existing = stored.get(record[key_pos])
+        if not (existing and len(existing) == 1 and existing[0][1] == record):
+            changed.append(record)
+
+    replaced_keys = [(r[key_pos],) for r in changed if r[key_pos] in stored]
+    removed = [row for (k,) in replaced_keys for row in stored[k]]
+    if replaced_keys:
+        conn.exec_driver_sql(f"DELETE FROM [{table_name}] WHERE [{key}] = ?", replaced_keys)
+    return changed, [row for _, row in removed], [rowid for rowid, _ in removed]
+
+
+def _records(df: pd.DataFrame) -> list:
+    # sqlite3 binds plain Python values only: no numpy scalars, no pd.NA.
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
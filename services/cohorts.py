@@ -0,0 +1,100 @@
+"""Cross-dataset cohort comparison.
+
+Compared tables are stitched together with UNION ALL views (CTEs) over
+their ``__summary__`` tables and grade columns, so a comparison reads the
+stored aggregate rows plus one grouped scan for the distributions — no
+dataset is loaded into pandas, however many tables are compared.
+
+The first dataset is the baseline the KPI deltas are measured against.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from services.summary import summary_table
+
+KPI_COLUMNS = ["students", "avg", "top", "low", "pass_rate"]
+
+
+@dataclass
+class CohortComparison:
+    datasets: list
+    kpis: pd.DataFrame          # dataset + KPI_COLUMNS + <kpi>_delta vs the baseline
+    departments: pd.DataFrame   # department × dataset average overall_grade
+    edges: np.ndarray
+    shares: pd.DataFrame        # bin × dataset, % of that dataset's graded students
+    skipped: list = field(default_factory=list)
+
+    @property
+    def baseline(self) -> str:
+        return self.datasets[0]
+
+
+def _summaries_view(tables) -> str:
+    return " UNION ALL ".join(
+        f"SELECT {i} AS pos, scope, name, n_rows, n_graded, total, min_grade, max_grade, n_pass "
+        f"FROM [{summary_table(t)}]"
+        for i, t in enumerate(tables)
+    )
+
+
+def _grades_view(tables) -> str:
+    return " UNION ALL ".join(
+        f"SELECT {i} AS pos, overall_grade AS grade FROM [{t}]" for i, t in enumerate(tables)
+    )
+
+
+def compare_cohorts(conn, tables, nbins: int = 20, skipped=()) -> CohortComparison:
+    """Compare typed ``tables`` whose summaries are current (SQL aggregates only)."""
+    tables = list(tables)
+    summaries = f"WITH summaries AS ({_summaries_view(tables)})"
+
+    deltas = ", ".join(f"k.{c} - b.{c} AS {c}_delta" for c in KPI_COLUMNS)
+    kpis = pd.read_sql_query(text(
+        f"{summaries}, kpis AS ("
+        "  SELECT pos, n_rows AS students, total / n_graded AS avg, max_grade AS top,"
+        "         min_grade AS low, 100.0 * n_pass / n_rows AS pass_rate"
+        "  FROM summaries WHERE scope = 'overall') "
+        f"SELECT k.*, {deltas} FROM kpis k CROSS JOIN (SELECT * FROM kpis WHERE pos = 0) b "
+        "ORDER BY k.pos"
+    ), conn)
+    kpis.insert(0, "dataset", [tables[p] for p in kpis.pop("pos")])
+
+    side_by_side = ", ".join(
+        f"MAX(CASE WHEN pos = {i} THEN total / n_graded END) AS d{i}" for i in range(len(tables))
+    )
+    departments = pd.read_sql_query(text(
+        f"{summaries} SELECT name AS department, {side_by_side} FROM summaries "
+        "WHERE scope = 'department' GROUP BY name ORDER BY name"
+    ), conn)
+    departments.columns = ["department", *tables]
+
+    edges, shares = _distribution_shift(conn, tables, summaries, nbins)
+    return CohortComparison(tables, kpis, departments, edges, shares, list(skipped))
+
+
+def _distribution_shift(conn, tables, summaries: str, nbins: int):
+    # Common edges across all datasets, from the stored per-table min/max.
+    low, high = conn.execute(text(
+        f"{summaries} SELECT MIN(min_grade), MAX(max_grade) FROM summaries WHERE scope = 'overall'"
+    )).fetchone()
+    counts = np.zeros((nbins, len(tables)), dtype="int64")
+    if low is None:
+        return np.linspace(0, 1, nbins + 1), pd.DataFrame(counts, columns=tables, dtype="float64")
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, nbins + 1)
+
+    rows = conn.execute(text(
+        f"WITH grades AS ({_grades_view(tables)}) "
+        "SELECT pos, MIN(CAST((grade - :low) / :width AS INTEGER), :last) AS bin, COUNT(*) "
+        "FROM grades WHERE grade IS NOT NULL GROUP BY pos, bin"
+    ), {"low": low, "width": (high - low) / nbins, "last": nbins - 1}).fetchall()
+    for pos, bin_index, count in rows:
+        counts[int(bin_index), pos] += count
+
+    totals = counts.sum(axis=0)
+    shares = np.divide(counts * 100.0, totals, out=np.zeros(counts.shape), where=totals > 0)
+    return edges, pd.DataFrame(shares, columns=tables)
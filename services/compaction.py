@@ -0,0 +1,87 @@
+"""Memory-compact frames for the process-wide dataset cache.
+
+A loaded table is compacted once, before it is cached and shared by every
+session:
+
+* low-cardinality text (department, course, year, ...) becomes
+  ``category``: one small code per row instead of one string per row,
+* grades are downcast to float32 when every value survives the round
+  trip exactly (whole or half marks), so no statistic or bin changes,
+* other integer columns are downcast to the smallest integer type that fits.
+
+``compact_frame`` returns a ``MemoryReport`` with the frame's footprint
+before and after.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from services.schema import GRADE_COLUMNS
+
+# Text columns with at most this share of distinct values become categorical.
+CATEGORY_MAX_SHARE = 0.5
+# Rows inspected to rule out high-cardinality columns (names, roll numbers)
+# before paying for a full categorical conversion.
+CATEGORY_SAMPLE_ROWS = 10_000
+
+
+@dataclass
+class MemoryReport:
+    table_name: str
+    rows: int = 0
+    before_bytes: int = 0
+    after_bytes: int = 0
+    columns: dict = field(default_factory=dict)   # column -> (old dtype, new dtype)
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.before_bytes - self.after_bytes
+
+    def summary(self) -> str:
+        share = self.saved_bytes / self.before_bytes * 100 if self.before_bytes else 0.0
+        return (f"{_size(self.before_bytes)} → {_size(self.after_bytes)} "
+                f"({share:.0f}% smaller, {self.rows:,} rows)")
+
+
+def _size(nbytes: int) -> str:
+    return f"{nbytes / 2**20:.1f} MB" if nbytes >= 2**20 else f"{nbytes / 1024:.0f} KB"
+
+
+def _is_text(series: pd.Series) -> bool:
+    return pd.api.types.is_string_dtype(series.dtype) or series.dtype == object
+
+
+def _low_cardinality(series: pd.Series) -> bool:
+    sample = series.iloc[:CATEGORY_SAMPLE_ROWS]
+    return sample.nunique(dropna=True) <= len(sample) * CATEGORY_MAX_SHARE
+
+
+def compact_frame(df: pd.DataFrame, table_name: str = ""):
+    """``(compacted frame, MemoryReport)``; ``df`` itself is left untouched."""
+    report = MemoryReport(table_name, rows=len(df),
+                          before_bytes=int(df.memory_usage(deep=True).sum()))
+    changes = {}
+    for col in df.columns:
+        series = df[col]
+        if _is_text(series):
+            if len(series) and _low_cardinality(series):
+                compacted = series.astype("category")
+                if len(compacted.cat.categories) <= len(series) * CATEGORY_MAX_SHARE:
+                    changes[col] = compacted
+        elif col in GRADE_COLUMNS and series.dtype == np.float64:
+            downcast = series.astype(np.float32)
+            if np.array_equal(downcast.to_numpy(np.float64), series.to_numpy(), equal_nan=True):
+                changes[col] = downcast
+        elif series.dtype.kind in "iu" and col not in GRADE_COLUMNS:
+            # Grades stay wide enough to add up (Q1 + Q2 + Q3) without overflow.
+            downcast = pd.to_numeric(series, downcast="integer")
+            if downcast.dtype != series.dtype:
+                changes[col] = downcast
+
+    for col, compacted in changes.items():
+        report.columns[col] = (str(df[col].dtype), str(compacted.dtype))
+    if changes:
+        df = df.assign(**changes)
+    report.after_bytes = int(df.memory_usage(deep=True).sum())
+    return df, report
@@ -0,0 +1,91 @@
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bands(name: str, default: list) -> list:
+    # "A:90,B:75,C:60,D:50" -> [("A", 90.0), ("B", 75.0), ...], highest first
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    try:
+        bands = [(label.strip(), float(mark)) for label, mark in
+                 (item.split(":") for item in raw.split(",") if item.strip())]
+    except ValueError:
+        return default
+    return sorted(bands, key=lambda band: band[1], reverse=True)
+
+
+# ─────────────────────────────────────────────────────
+# Storage
+# ─────────────────────────────────────────────────────
+DB_PATH = os.environ.get("SAVEETHA_DB_PATH", "saveetha.db")
+SQLITE_CACHE_MB = _env_int("SAVEETHA_SQLITE_CACHE_MB", 64)
+SNAPSHOT_DIR = os.environ.get("SAVEETHA_SNAPSHOT_DIR", "saveetha_snapshots")
+# Engine for KPI, histogram, groupby and ranking queries: "sqlite" (default)
+# or "duckdb" (needs pyarrow and the optional duckdb package, installed by
+# requirements-duckdb.txt; see services/backends.py).
+ANALYTICS_ENGINE = os.environ.get("SAVEETHA_ENGINE", "sqlite").strip().lower()
+
+# ─────────────────────────────────────────────────────
+# Multi-process serving (see services/write_lock.py, services/shared_cache.py)
+# ─────────────────────────────────────────────────────
+# Finished frames shared by every server process on this host; empty disables.
+SHARED_CACHE_DIR = os.environ.get("SAVEETHA_SHARED_CACHE_DIR", "saveetha_cache")
+# How often a process checks the persisted table versions for changes made
+# by other processes (uploads, deletes) and drops its stale cache entries.
+CACHE_SYNC_SECONDS = _env_float("SAVEETHA_CACHE_SYNC_SECONDS", 1.0)
+# Uploads and deletes hold one writer lock across processes; a writer waits
+# at most this long for it.
+WRITE_LOCK_TIMEOUT = _env_float("SAVEETHA_WRITE_LOCK_TIMEOUT", 600)
+# SQLite busy timeout, then retries with exponential backoff for writes that
+# still hit "database is locked".
+SQLITE_BUSY_TIMEOUT = _env_float("SAVEETHA_SQLITE_BUSY_TIMEOUT", 10)
+WRITE_RETRIES = _env_int("SAVEETHA_WRITE_RETRIES", 5)
+
+# ─────────────────────────────────────────────────────
+# Dataset cache (shared by every session in the process)
+# ─────────────────────────────────────────────────────
+CACHE_MEMORY_MB = _env_int("SAVEETHA_CACHE_MB", 512)
+
+# ─────────────────────────────────────────────────────
+# Ingest
+# ─────────────────────────────────────────────────────
+INGEST_CHUNK_ROWS = _env_int("SAVEETHA_INGEST_CHUNK_ROWS", 5000)
+# SQLite has a single writer, so more than one ingest thread only queues
+# on the database lock.
+INGEST_WORKERS = _env_int("SAVEETHA_INGEST_WORKERS", 1)
+
+# ─────────────────────────────────────────────────────
+# Grading
+# ─────────────────────────────────────────────────────
+PASS_MARK = _env_float("SAVEETHA_PASS_MARK", 60)
+
+# overall_grade >= mark -> band; anything below the last band is "F"
+GRADE_BANDS = _env_bands("SAVEETHA_GRADE_BANDS", [("A", 90), ("B", 75), ("C", 60), ("D", 50)])
+
+# A student is flagged at risk when the overall grade is below AT_RISK_MARK
+# or any single exam is below EXAM_RISK_MARK.
+AT_RISK_MARK = _env_float("SAVEETHA_AT_RISK_MARK", 65)
+EXAM_RISK_MARK = _env_float("SAVEETHA_EXAM_RISK_MARK", 40)
+
+# ─────────────────────────────────────────────────────
+# Profiling (see services/timing.py)
+# ─────────────────────────────────────────────────────
+PROFILE = bool(_env_int("SAVEETHA_PROFILE", 0))
+# Prometheus text export: rewritten after every profiled rerun, and/or
+# served on 127.0.0.1:<port>/metrics. Empty / 0 disables each.
+METRICS_FILE = os.environ.get("SAVEETHA_METRICS_FILE", "")
+METRICS_PORT = _env_int("SAVEETHA_METRICS_PORT", 0)
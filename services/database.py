@@ -0,0 +1,687 @@
+import itertools
+from functools import lru_cache
+
+import pandas as pd
+from sqlalchemy import create_engine, event, inspect, text
+
+from services.analytics import DepartmentBreakdown, department_breakdown, sql_department_breakdown
+from services.backends import get_engine
+from services.bulk_loader import BatchDelta, LoadReport, bulk_load
+from services.cohorts import CohortComparison, compare_cohorts
+from services.compaction import MemoryReport, compact_frame
+from services.config import (
+    DB_PATH, CACHE_MEMORY_MB, CACHE_SYNC_SECONDS, SQLITE_BUSY_TIMEOUT, SQLITE_CACHE_MB,
+)
+from services.derived import add_derived_columns, derived_names
+from services.dataset_cache import DatasetCache
+from services.ledger import find_upload, record_upload, forget_table
+from services.histograms import (
+    apply_histogram_delta, bin_counts, drop_histograms, stored_bin_counts,
+)
+from services.schema import (
+    GRADE_COLUMNS, infer_schema, create_table, save_schema, load_schema, drop_schema,
+)
+from services.shared_cache import drop_shared, load_shared, shared_cache_enabled, store_shared
+from services.rankings import (
+    apply_rank_delta, build_rank_index, drop_rank_index, has_rank_index, rank_metrics,
+    student_rank_sql, top_students,
+)
+from services.search import (
+    apply_search_delta, build_search_index, drop_search_index, has_search_index, search_students,
+)
+from services.snapshots import snapshots_enabled, read_snapshot, write_snapshot, delete_snapshot
+from services.student_query import StudentQuery, build_page_query
+from services.summary import (
+    DatasetSummary, apply_summary_delta, build_summary, read_summary, summary_from_frame,
+    summary_table,
+)
+from services.timing import stage
+from services.versions import all_versions, database_id, get_version, bump_version
+from services.write_lock import retry_locked, writer_lock
+
+# ─────────────────────────────────────────────────────
+# Database (SQLite — direct access, no API server)
+# ─────────────────────────────────────────────────────
+# Lives outside streamlit_app.py so the engine and the dataset cache are
+# created once per process instead of on every rerun.
+DATABASE_URL = f"sqlite:///./{DB_PATH}"
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+)
+
+
+@event.listens_for(engine, "connect")
+def _tune_sqlite(dbapi_conn, _):
+    # WAL lets readers keep browsing while an upload is writing; NORMAL
+    # sync is durable under WAL except on power loss mid-checkpoint.
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _sync_cache():
+    # Picks up uploads and deletes made by other server processes.
+    with engine.begin() as conn:
+        versions = all_versions(conn)
+    if dataset_cache.apply_versions(versions):
+        dataset_cache.bump(COHORTS_KEY)
+
+
+dataset_cache = DatasetCache(
+    CACHE_MEMORY_MB * 1024 * 1024, sync=_sync_cache, sync_seconds=CACHE_SYNC_SECONDS
+)
+
+# Bookkeeping tables (schema registry, summaries, ...) are hidden from the UI.
+INTERNAL_PREFIX = "__"
+
+# Cache slot for cross-table results; invalidated whenever any table changes.
+COHORTS_KEY = f"{INTERNAL_PREFIX}cohorts"
+
+# Re-uploads replace the stored row with the same roll number.
+UPSERT_KEY = "roll_no_"
+
+# Columns a student can be looked up by; each gets an index at upload time.
+# Only the upsert key's is UNIQUE: rows without a roll number, or whose
+# roll number a correction changes, may repeat a stored register number.
+LOOKUP_COLUMNS = ["roll_no_", "register_no_"]
+
+# Columns the students grid filters and sorts on most (plain indexes).
+FILTER_COLUMNS = ["department", "overall_grade"]
+
+# Footprint of each table's loaded frames before and after compaction:
+# table -> {projected columns (None = all): MemoryReport}.
+_memory_reports = {}
+
+
+def db_get_tables():
+    return [t for t in inspect(engine).get_table_names() if not t.startswith(INTERNAL_PREFIX)]
+
+
+def db_get_all_data(table_name: str, columns=None) -> pd.DataFrame:
+    """Rows of ``table_name``; ``columns`` limits which stored columns are read.
+
+    Derived columns are included whenever their inputs are. Every session
+    shares one cached frame (and every server process one mapped copy of
+    it, see services.shared_cache); callers get a copy-on-write view of it,
+    so modifying the result never touches the shared rows.
+    """
+    try:
+        if columns is None:
+            full = dataset_cache.get_or_load(table_name, lambda: _load_shared_table(table_name))
+            return full.copy(deep=False)
+        full = dataset_cache.peek(table_name)
+        if full is not None:
+            keep = list(columns) + derived_names(columns)
+            return full[[c for c in full.columns if c in keep]]
+        kind = "rows:" + ",".join(sorted(columns))
+        return dataset_cache.get_or_load(
+            table_name, lambda: _load_shared_table(table_name, columns, kind), kind=kind,
+        )
+    except Exception:
+        return pd.DataFrame()
+
+
+def db_get_columns(table_name: str) -> list:
+    """Stored plus derived column names, without loading any rows."""
+    def load():
+        with engine.connect() as conn:
+            schema = load_schema(conn, table_name)
+        if schema is None:
+            columns = list(db_get_all_data(table_name).columns)
+        else:
+            columns = list(schema)
+        return columns + [c for c in derived_names(columns) if c not in columns]
+
+    try:
+        return db_cached(table_name, "columns", load)
+    except Exception:
+        return []
+
+
+def db_row_count(table_name: str) -> int:
+    def load():
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM [{table_name}]")).scalar()
+
+    try:
+        return db_cached(table_name, "count", load)
+    except Exception:
+        return 0
+
+
+def db_get_student(table_name: str, roll_no: str):
+    """The student's row, with ``<grade>_rank``, ``<grade>_dept_rank`` and
+    ``<grade>_percentile`` for each grade column of a typed table."""
+    try:
+        student = _lookup_student(table_name, dataset_cache.generation(table_name), roll_no)
+        if student:
+            return dict(student)
+    except Exception:
+        pass
+    return None
+
+
+def db_search_students(table_name: str, query: str, limit: int = 10) -> list:
+    """Top ``limit`` students whose name, roll or register number matches ``query``.
+
+    Served from the table's trigram index (built on first use for tables
+    uploaded before search existed); no rows are loaded into pandas.
+    """
+    try:
+        with engine.connect() as conn:
+            if not has_search_index(conn, table_name):
+                retry_locked(lambda: _build_search_index(table_name))
+            with stage("sql.search"):
+                return search_students(conn, table_name, query, limit)
+    except Exception:
+        return []
+
+
+def db_upload(data, table_name: str, file_digest: str = None, file_name: str = None,
+              progress=None) -> LoadReport:
+    """Load ``data`` (a DataFrame or an iterable of DataFrame chunks).
+
+    Chunks go through the bulk loader one transaction each, so a streamed
+    workbook never has to be held in memory as a whole. Into an existing
+    table, rows are upserted by roll number and unchanged rows are skipped;
+    its summary, stored histogram bins, rank and search indexes are then
+    updated from each batch's delta rather than recomputed over the whole table.
+    ``file_digest`` records the source file in the uploads ledger;
+    ``progress(report)`` is called after every written batch.
+    """
+    chunks = iter([data] if isinstance(data, pd.DataFrame) else data)
+    first = next(chunks, None)
+    if first is None:
+        return LoadReport(table_name)
+
+    # One writer across threads and server processes: uploads never
+    # interleave their batches or race to create the same table.
+    with writer_lock():
+        schema, created, incremental = retry_locked(lambda: _begin_upload(table_name, first))
+        version = None
+        try:
+            report = bulk_load(
+                engine, table_name, schema, itertools.chain([first], chunks),
+                upsert_key=None if created else UPSERT_KEY, progress=progress,
+                on_delta=(lambda conn, delta: _apply_delta(conn, table_name, delta))
+                if incremental else None,
+            )
+            # Derived data does not cover columns the upload added: rebuild it.
+            incremental = incremental and not report.added
+            report.incremental = incremental
+            version = retry_locked(lambda: _finish_upload(
+                table_name, report, created, incremental, file_digest, file_name
+            ))
+        except Exception:
+            if created:
+                db_delete_table(table_name)
+            raise
+        finally:
+            dataset_cache.bump(table_name, version)
+            dataset_cache.bump(COHORTS_KEY)
+    return report
+
+
+def db_find_upload(file_digest: str, table_name: str):
+    """Ledger entry if this exact file content is already in ``table_name``."""
+    try:
+        with engine.begin() as conn:
+            return find_upload(conn, file_digest, table_name)
+    except Exception:
+        return None
+
+
+def db_record_upload(file_digest: str, table_name: str, file_name: str, rows: int):
+    def record():
+        with engine.begin() as conn:
+            record_upload(conn, file_digest, table_name, file_name, rows)
+
+    retry_locked(record)
+
+
+def db_delete_table(table_name: str):
+    def drop():
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS [{table_name}]"))
+            conn.execute(text(f"DROP TABLE IF EXISTS [{summary_table(table_name)}]"))
+            drop_search_index(conn, table_name)
+            drop_rank_index(conn, table_name)
+            drop_histograms(conn, table_name)
+            drop_schema(conn, table_name)
+            forget_table(conn, table_name)
+            return bump_version(conn, table_name)
+
+    with writer_lock():
+        version = retry_locked(drop)
+        delete_snapshot(table_name)
+        drop_shared(table_name)
+    _memory_reports.pop(table_name, None)
+    dataset_cache.bump(table_name, version)
+    dataset_cache.bump(COHORTS_KEY)
+
+
+def db_get_summary(table_name: str) -> DatasetSummary:
+    try:
+        return dataset_cache.get_or_load(
+            table_name, lambda: _load_summary(table_name), kind="summary"
+        )
+    except Exception:
+        return summary_from_frame(pd.DataFrame())
+
+
+def db_compare_cohorts(table_names, nbins: int = 20):
+    """KPIs, department averages and grade distributions of several tables.
+
+    Computed in SQL over the stored summaries; tables without typed grades
+    (legacy TEXT uploads, sheets without ``overall_grade``) are listed in
+    ``skipped``. Returns ``None`` if the comparison fails.
+    """
+    table_names = list(table_names)
+
+    def load() -> CohortComparison:
+        comparable = []
+        with engine.begin() as conn:
+            for table in table_names:
+                if load_schema(conn, table) is None:
+                    continue
+                summary = read_summary(conn, table)
+                if summary is None or not summary.is_current:
+                    _refresh_summary(conn, table)
+                    summary = read_summary(conn, table)
+                if summary.has_grades:
+                    comparable.append(table)
+            if not comparable:
+                return None
+            skipped = [t for t in table_names if t not in comparable]
+            return compare_cohorts(conn, comparable, nbins, skipped)
+
+    try:
+        return db_cached(COHORTS_KEY, f"compare:{nbins}:" + "|".join(table_names),
+                         lambda: retry_locked(load))
+    except Exception:
+        return None
+
+
+def db_query_students(table_name: str, query: StudentQuery) -> pd.DataFrame:
+    """One page of students matching ``query``."""
+    try:
+        with stage("sql.students_page"), engine.connect() as conn:
+            page_sql, _, params, _ = _student_page_sql(conn, table_name, query)
+            page = pd.read_sql_query(text(page_sql), conn, params=params)
+    except Exception:
+        return pd.DataFrame()
+    # Legacy tables hold grades as text; a typed page whose grades are all
+    # blank comes back as object dtype holding None. Both need numbers.
+    for col in GRADE_COLUMNS:
+        if col in page.columns:
+            page[col] = pd.to_numeric(page[col], errors="coerce")
+    return add_derived_columns(page)
+
+
+def db_count_students(table_name: str, query: StudentQuery) -> int:
+    try:
+        with engine.connect() as conn:
+            _, count_sql, params, _ = _student_page_sql(conn, table_name, query)
+            return conn.execute(text(count_sql), params).scalar()
+    except Exception:
+        return 0
+
+
+def db_distinct_values(table_name: str, column: str) -> list:
+    def load():
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                f"SELECT DISTINCT [{column}] FROM [{table_name}] "
+                f"WHERE [{column}] IS NOT NULL ORDER BY 1"
+            )).fetchall()
+        return [r[0] for r in rows]
+
+    try:
+        return db_cached(table_name, f"distinct:{column}", load)
+    except Exception:
+        return []
+
+
+def db_get_histogram(table_name: str, column: str, nbins: int):
+    """``(counts, edges)`` for ``column``, cached per table generation.
+
+    Typed tables keep their bins in ``__histograms`` across uploads.
+    """
+    def load():
+        with stage("sql.histogram"), engine.begin() as conn:
+            if load_schema(conn, table_name) is not None:
+                return stored_bin_counts(conn, table_name, column, nbins, get_engine())
+        # Legacy TEXT table: bin the coerced frame instead.
+        return bin_counts(db_get_all_data(table_name)[column], nbins)
+
+    try:
+        return db_cached(table_name, f"hist:{column}:{nbins}", load)
+    except Exception:
+        return bin_counts([], nbins)
+
+
+def db_department_breakdown(table_name: str, nbins: int = 15, top_n: int = 3) -> DepartmentBreakdown:
+    """Per-department histograms and top ``top_n`` students, cached per generation.
+
+    Typed tables are grouped in SQL by the configured engine and take their
+    winners from the rank index; legacy TEXT tables are handled in pandas
+    over the loaded columns.
+    """
+    def load():
+        with engine.connect() as conn:
+            if load_schema(conn, table_name) is not None:
+                columns = [c["name"] for c in inspect(conn).get_columns(table_name)]
+                top = None
+                if has_rank_index(conn, table_name):
+                    with stage("sql.top_students"):
+                        top = top_students(conn, table_name, columns, top_n)
+                return sql_department_breakdown(conn, table_name, columns, get_engine(),
+                                                nbins, top_n, top)
+        return department_breakdown(
+            db_get_all_data(table_name, ["department", "overall_grade", "student_name"]),
+            nbins, top_n,
+        )
+
+    try:
+        return db_cached(table_name, f"departments:{nbins}:{top_n}", load)
+    except Exception:
+        return department_breakdown(
+            pd.DataFrame(columns=["department", "overall_grade", "student_name"]), nbins, top_n
+        )
+
+
+def db_memory_report(table_name: str):
+    """Before/after compaction footprint of ``table_name``'s loaded frames.
+
+    Sums the latest load of each projection (full rows, department
+    columns, ...); ``None`` until something has been loaded.
+    """
+    reports = list(_memory_reports.get(table_name, {}).values())
+    if not reports:
+        return None
+    combined = MemoryReport(table_name, rows=max(r.rows for r in reports))
+    for report in reports:
+        combined.before_bytes += report.before_bytes
+        combined.after_bytes += report.after_bytes
+        combined.columns.update(report.columns)
+    return combined
+
+
+def db_cached(table_name: str, kind: str, build):
+    """Cache ``build()`` alongside the table, invalidated with its rows."""
+    return dataset_cache.get_or_load(table_name, build, kind=kind)
+
+
+def db_cache_stats() -> dict:
+    return dataset_cache.stats()
+
+
+def _begin_upload(table_name: str, first: pd.DataFrame):
+    """Create or look up the table: ``(schema, created, incremental)``."""
+    with engine.begin() as conn:
+        schema, created = _prepare_table(conn, table_name, first)
+        if not created:
+            # The upsert looks stored rows up by roll number.
+            _create_lookup_indexes(conn, table_name)
+        return schema, created, not created and _maintains_aggregates(conn, table_name)
+
+
+def _finish_upload(table_name: str, report: LoadReport, created: bool, incremental: bool,
+                   file_digest: str = None, file_name: str = None):
+    """Index, version and record a loaded upload; returns the table's version."""
+    with engine.begin() as conn:
+        if created or report.written or report.replaced:
+            _create_lookup_indexes(conn, table_name)
+            if incremental:
+                # Aggregates and indexes already hold the delta; the snapshot
+                # is rewritten by the next full load.
+                bump_version(conn, table_name)
+                if not has_rank_index(conn, table_name):
+                    _refresh_rank_index(conn, table_name)
+            else:
+                # Snapshot first: the DuckDB engine builds the summary from it.
+                _refresh_snapshot(conn, table_name, bump_version(conn, table_name))
+                _refresh_summary(conn, table_name)
+                _refresh_search_index(conn, table_name)
+                _refresh_rank_index(conn, table_name)
+                drop_histograms(conn, table_name)
+        if file_digest:
+            record_upload(conn, file_digest, table_name, file_name, report.rows)
+        return get_version(conn, table_name)
+
+
+def _prepare_table(conn, table_name: str, df: pd.DataFrame):
+    schema = load_schema(conn, table_name)
+    if schema is not None:
+        return schema, False
+    if inspect(conn).has_table(table_name):
+        # Table created before typed uploads: every column is TEXT.
+        return {col: "TEXT" for col in df.columns}, False
+    schema = infer_schema(df)
+    create_table(conn, table_name, schema)
+    save_schema(conn, table_name, schema)
+    return schema, True
+
+
+def _refresh_snapshot(conn, table_name: str, version: int):
+    schema = load_schema(conn, table_name)
+    if schema is None or not snapshots_enabled():
+        return
+    try:
+        write_snapshot(conn, table_name, schema, version)
+    except Exception:
+        # SQLite already holds the rows; the snapshot is rebuilt on first load.
+        delete_snapshot(table_name)
+
+
+def _student_page_sql(conn, table_name: str, query: StudentQuery):
+    columns = [c["name"] for c in inspect(conn).get_columns(table_name)]
+    typed = load_schema(conn, table_name) is not None
+    return (*build_page_query(table_name, columns, query, typed), typed)
+
+
+def _refresh_summary(conn, table_name: str):
+    if load_schema(conn, table_name) is None:
+        # Legacy TEXT table: aggregates are computed from the loaded frame.
+        conn.execute(text(f"DROP TABLE IF EXISTS [{summary_table(table_name)}]"))
+        return
+    columns = [c["name"] for c in inspect(conn).get_columns(table_name)]
+    build_summary(conn, table_name, columns, get_engine())
+
+
+def _refresh_search_index(conn, table_name: str):
+    columns = [c["name"] for c in inspect(conn).get_columns(table_name)]
+    build_search_index(conn, table_name, columns)
+
+
+def _refresh_rank_index(conn, table_name: str):
+    if load_schema(conn, table_name) is None:
+        # Legacy TEXT table: grades would rank as text.
+        drop_rank_index(conn, table_name)
+        return
+    columns = [c["name"] for c in inspect(conn).get_columns(table_name)]
+    build_rank_index(conn, table_name, columns)
+
+
+def _build_search_index(table_name: str):
+    with engine.begin() as conn:
+        # Another process may have built it in the meantime.
+        if not has_search_index(conn, table_name):
+            _refresh_search_index(conn, table_name)
+
+
+def _maintains_aggregates(conn, table_name: str) -> bool:
+    """Whether uploads into ``table_name`` can update its derived data in place."""
+    if load_schema(conn, table_name) is None:
+        return False
+    summary = read_summary(conn, table_name)
+    return summary is not None and summary.is_current
+
+
+def _apply_delta(conn, table_name: str, delta: BatchDelta):
+    with stage("ingest.delta"):
+        apply_summary_delta(conn, table_name, delta.columns, delta.removed, delta.added)
+        apply_histogram_delta(conn, table_name, delta.columns, delta.removed, delta.added)
+        if has_rank_index(conn, table_name):
+            apply_rank_delta(conn, table_name, delta.columns, delta.removed, delta.added)
+        if has_search_index(conn, table_name):
+            apply_search_delta(conn, table_name, delta.columns, delta.removed,
+                               delta.removed_rowids, delta.added, delta.first_rowid)
+
+
+def _load_summary(table_name: str) -> DatasetSummary:
+    def read():
+        with engine.begin() as conn:
+            summary = read_summary(conn, table_name)
+            stale = summary is None or not summary.is_current
+            if stale and load_schema(conn, table_name) is not None:
+                # Typed table uploaded before summaries existed, or the pass
+                # mark or summary layout has changed since it was built.
+                _refresh_summary(conn, table_name)
+                summary = read_summary(conn, table_name)
+            return summary
+
+    with stage("load.summary"):
+        summary = retry_locked(read)
+    if summary is None:
+        summary = summary_from_frame(db_get_all_data(table_name))
+    return summary
+
+
+def _create_lookup_indexes(conn, table_name: str):
+    columns = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    existing = dict(conn.execute(text(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"
+    ), {"t": table_name}).fetchall())
+    for col in LOOKUP_COLUMNS:
+        name = f"ix_{table_name}_{col}"
+        if col not in columns:
+            continue
+        if col != UPSERT_KEY:
+            if (existing.get(name) or "").upper().startswith("CREATE UNIQUE"):
+                # Indexed as UNIQUE by an earlier version.
+                conn.execute(text(f"DROP INDEX [{name}]"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS [{name}] ON [{table_name}] ([{col}])"))
+            continue
+        if name in existing:
+            # Skips the duplicate scan below, which would cost a full pass.
+            continue
+        # Fall back to a plain index when the sheet already holds duplicates.
+        duplicate = conn.execute(text(
+            f"SELECT 1 FROM [{table_name}] WHERE [{col}] IS NOT NULL "
+            f"GROUP BY [{col}] HAVING COUNT(*) > 1 LIMIT 1"
+        )).fetchone()
+        unique = "" if duplicate else "UNIQUE "
+        conn.execute(text(
+            f"CREATE {unique}INDEX IF NOT EXISTS [{name}] ON [{table_name}] ([{col}])"
+        ))
+    for col in FILTER_COLUMNS:
+        if col in columns:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS [ix_{table_name}_{col}] "
+                f"ON [{table_name}] ([{col}])"
+            ))
+
+
+@lru_cache(maxsize=64)
+def _prepare_lookup(table_name: str, generation: int) -> tuple:
+    """Create missing lookup and rank indexes (tables uploaded before they were
+    built at upload time); returns the ranked columns and whether the table
+    has departments to rank within."""
+    def prepare():
+        with engine.begin() as conn:
+            _create_lookup_indexes(conn, table_name)
+            if not has_rank_index(conn, table_name):
+                _refresh_rank_index(conn, table_name)
+            columns = {c["name"] for c in inspect(conn).get_columns(table_name)}
+            return tuple(rank_metrics(conn, table_name)), "department" in columns
+
+    return retry_locked(prepare)
+
+
+@lru_cache(maxsize=None)
+def _student_query(table_name: str, metrics: tuple, departments: bool):
+    # Built once per table so SQLAlchemy and sqlite3 reuse the compiled statement.
+    return text(student_rank_sql(table_name, metrics, departments))
+
+
+@lru_cache(maxsize=256)
+def _lookup_student(table_name: str, generation: int, roll_no: str):
+    # ``generation`` is part of the cache key only: a re-upload or delete bumps
+    # it, so records of the old table version are never returned again.
+    metrics, departments = _prepare_lookup(table_name, generation)
+    with engine.connect() as conn:
+        row = conn.execute(_student_query(table_name, metrics, departments),
+                           {"roll": roll_no}).fetchone()
+    return dict(row._mapping) if row else None
+
+
+def _load_shared_table(table_name: str, columns=None, kind: str = "rows") -> pd.DataFrame:
+    """``_load_table`` through the frame files shared by all server processes."""
+    if not shared_cache_enabled():
+        return _load_table(table_name, columns)
+    projection = None if columns is None else tuple(columns)
+    with engine.begin() as conn:
+        version, database = get_version(conn, table_name), database_id(conn)
+    with stage("load.shared"):
+        shared = load_shared(table_name, version, database, kind)
+    if shared is not None:
+        df, report = shared
+        if report is not None:
+            _memory_reports.setdefault(table_name, {})[projection] = report
+        return df
+    df = _load_table(table_name, columns)
+    if not df.empty:
+        store_shared(table_name, version, database, kind, df,
+                     _memory_reports.get(table_name, {}).get(projection))
+    return df
+
+
+def _load_table(table_name: str, columns=None) -> pd.DataFrame:
+    df = None
+    with engine.begin() as conn:
+        schema = load_schema(conn, table_name)
+        if schema is not None and snapshots_enabled():
+            version, database = get_version(conn, table_name), database_id(conn)
+            with stage("load.snapshot"):
+                df = read_snapshot(table_name, version, database, columns)
+                if df is None:
+                    # Missing or stale: rebuild from SQLite, the source of truth.
+                    write_snapshot(conn, table_name, schema, version)
+                    df = read_snapshot(table_name, version, database, columns)
+        if df is None:
+            with stage("load.sql"):
+                if schema is not None and columns is not None:
+                    selected = ", ".join(f"[{c}]" for c in columns if c in schema)
+                    df = pd.read_sql_query(text(f"SELECT {selected} FROM [{table_name}]"), conn)
+                else:
+                    df = pd.read_sql_table(table_name, conn)
+    if df.empty:
+        return df
+
+    if schema is None:
+        # Legacy all-TEXT table: clean names and coerce grades on read.
+        with stage("transform.clean"):
+            df.columns = (
+                df.columns.str.strip()
+                .str.lower()
+                .str.replace(" ", "_")
+                .str.replace("\n", "")
+            )
+        with stage("transform.coerce"):
+            for col in GRADE_COLUMNS:
+                if col in df.columns:
+                    df[col] = pd.to_numeric(df[col], errors="coerce")
+        if columns is not None:
+            df = df[[c for c in df.columns if c in columns]]
+
+    with stage("transform.derived"):
+        df = add_derived_columns(df)
+    with stage("transform.compact"):
+        df, report = compact_frame(df, table_name)
+    _memory_reports.setdefault(table_name, {})[None if columns is None else tuple(columns)] = report
+    return df
@@ -0,0 +1,189 @@
+"""Process-wide cache of loaded datasets.
+
+Streamlit re-executes ``streamlit_app.py`` on every interaction, so anything
+kept at module level there is rebuilt each rerun. This module is imported
+once per process, which makes it the place to keep decoded tables around.
+
+Entries are keyed by ``(table_name, generation, kind)``; ``kind`` separates the
+row frame from smaller derived objects (summaries, figures, ...) of the same
+table. ``bump`` advances a table's generation whenever its rows change, so
+stale entries are never served.
+
+Other server processes change tables too. Given a ``sync`` callable, the
+cache calls it at most every ``sync_seconds`` before a lookup; it reads the
+persisted table versions and passes them to ``apply_versions``, which bumps
+every table whose version moved since it was last seen.
+"""
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class DatasetCache:
+    def __init__(self, max_bytes: int, sync=None, sync_seconds: float = 1.0):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # (table, generation, kind) -> (value, nbytes)
+        self._generations = {}
+        self._versions = {}            # table -> persisted version last seen
+        self._sync = sync
+        self._sync_seconds = sync_seconds
+        self._synced_at = float("-inf")
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def generation(self, table_name: str) -> int:
+        self._maybe_sync()
+        with self._lock:
+            return self._generations.get(table_name, 0)
+
+    def bump(self, table_name: str, version: int = None) -> int:
+        """Invalidate every cached entry of ``table_name``.
+
+        ``version`` is the persisted version the change produced; recording
+        it keeps the next sync from invalidating the table a second time.
+        """
+        with self._lock:
+            if version is not None:
+                self._versions[table_name] = version
+            generation = self._generations.get(table_name, 0) + 1
+            self._generations[table_name] = generation
+            for key in [k for k in self._entries if k[0] == table_name]:
+                self._drop(key)
+            return generation
+
+    def apply_versions(self, versions: dict) -> list:
+        """Bump the tables whose persisted version moved; returns their names."""
+        with self._lock:
+            changed = [
+                table for table, version in versions.items()
+                if self._versions.get(table, version) != version
+                or (table not in self._versions and table in self._generations)
+            ]
+            self._versions.update(versions)
+            for table in changed:
+                self.bump(table)
+            return changed
+
+    def get_or_load(self, table_name: str, loader, kind: str = "rows"):
+        self._maybe_sync()
+        with self._lock:
+            key = (table_name, self._generations.get(table_name, 0), kind)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            # The table may have been re-uploaded while we were loading.
+            if key[1] != self._generations.get(table_name, 0):
+                return value
+            self._store(key, value)
+        return value
+
+    def peek(self, table_name: str, kind: str = "rows"):
+        """The current entry if it is already cached, without loading it."""
+        self._maybe_sync()
+        with self._lock:
+            key = (table_name, self._generations.get(table_name, 0), kind)
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "generations": dict(self._generations),
+            }
+
+    # ── internals ──────────────────────────────────────
+    def _maybe_sync(self):
+        if self._sync is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._synced_at < self._sync_seconds:
+                return
+            self._synced_at = now
+        # Outside the lock: the callback queries the database.
+        try:
+            self._sync()
+        except Exception:
+            # Served from the current generations until the next attempt.
+            pass
+
+    def _store(self, key, value):
+        nbytes = _size_of(value)
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+
+def _size_of(value) -> int:
+    """Approximate bytes held by ``value``, counted against ``max_bytes``.
+
+    Frames and arrays report their buffers. Anything else (summaries,
+    histograms, figures, ...) is walked through its containers and instance
+    attributes, counting each object once.
+    """
+    total, seen, stack = 0, set(), [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, pd.DataFrame):
+            total += int(obj.memory_usage(deep=True).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=True))
+        elif hasattr(obj, "nbytes"):
+            # Arrays, Arrow tables, ...
+            total += int(obj.nbytes or 0)
+        elif isinstance(obj, _OPAQUE):
+            continue
+        else:
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            elif hasattr(obj, "__dict__"):
+                stack.extend(vars(obj).values())
+    return total
+
+
+# Shared code and types, not data held by an entry.
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.MethodType,
+           types.BuiltinFunctionType)
@@ -0,0 +1,74 @@
+"""Columns derived from the grades.
+
+Each derived column is declared once in ``DERIVED_COLUMNS`` with the source
+columns it needs; ``add_derived_columns`` evaluates the ones whose inputs
+are present. Everything is vectorized, so the cost is a few array passes
+per dataset load rather than a Python call per row.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from services.config import PASS_MARK, GRADE_BANDS, AT_RISK_MARK, EXAM_RISK_MARK
+from services.schema import GRADE_COLUMNS
+
+
+@dataclass(frozen=True)
+class DerivedColumn:
+    name: str
+    requires: tuple
+    compute: Callable[[pd.DataFrame], object]  # array-like, one value per row
+
+
+def _labels(labels: list, codes: np.ndarray):
+    # Categorical straight from the codes: no per-row string is ever
+    # materialized, and the column stays one byte per row in memory.
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+def _result(df: pd.DataFrame):
+    # NaN >= mark is False, so ungraded students count as "Fail".
+    passed = df["overall_grade"].to_numpy() >= PASS_MARK
+    return _labels(["Fail", "Pass"], passed.astype(np.intp))
+
+
+def _grade_band(df: pd.DataFrame):
+    grade = df["overall_grade"].to_numpy()
+    codes = np.select(
+        [grade >= mark for _, mark in GRADE_BANDS],
+        np.arange(len(GRADE_BANDS)),
+        default=len(GRADE_BANDS),
+    )
+    return _labels([label for label, _ in GRADE_BANDS] + ["F"], codes)
+
+
+def _at_risk(df: pd.DataFrame) -> np.ndarray:
+    grade = df["overall_grade"].to_numpy()
+    risk = ~(grade >= AT_RISK_MARK)
+    for col in GRADE_COLUMNS:
+        if col != "overall_grade" and col in df.columns:
+            risk |= df[col].to_numpy() < EXAM_RISK_MARK
+    return risk
+
+
+DERIVED_COLUMNS = [
+    DerivedColumn("result", ("overall_grade",), _result),
+    DerivedColumn("grade_band", ("overall_grade",), _grade_band),
+    DerivedColumn("at_risk", ("overall_grade",), _at_risk),
+]
+
+
+def derived_names(columns, derived=DERIVED_COLUMNS) -> list:
+    """Names of the derived columns computable from ``columns``."""
+    return [c.name for c in derived if all(req in columns for req in c.requires)]
+
+
+def add_derived_columns(df: pd.DataFrame, columns=DERIVED_COLUMNS) -> pd.DataFrame:
+    derived = {
+        column.name: column.compute(df)
+        for column in columns
+        if all(req in df.columns for req in column.requires)
+    }
+    return df.assign(**derived) if derived else df
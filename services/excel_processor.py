@@ -34,48 +34,108 @@
 
 
 import pandas as pd
+from openpyxl import load_workbook
+
+from services.config import INGEST_CHUNK_ROWS
+from services.header_rules import resolve_header
+
 
 def process_student_excel(file) -> pd.DataFrame:
     df = pd.read_excel(file, header=[0, 1])
+    df.columns = normalize_columns(df.columns)
+    return df
 
-    new_columns = []
-
-    for main_col, sub_col in df.columns:
-        main_col = str(main_col).strip().lower()
-        sub_col = str(sub_col).strip().lower()
-
-        # ✅ Handle grade sub-columns
-        if main_col == "grade":
-            if "q1" in sub_col:
-                new_columns.append("grade_q1")
-            elif "q2" in sub_col:
-                new_columns.append("grade_q2")
-            elif "q3" in sub_col:
-                new_columns.append("grade_q3")
-            else:
-                new_columns.append(sub_col.replace("/", "_"))
-
-        # ✅ Handle normal columns (no sub column)
-        elif "unnamed" in sub_col:
-            clean_name = main_col.replace(".", "_").replace(" ", "_")
-
-            # ⭐ Normalize total grade column
-            if "grade" in clean_name and "300" in clean_name:
-                new_columns.append("overall_grade")
-            else:
-                new_columns.append(clean_name)
-
-        # ✅ Handle combined columns
-        else:
-            combined = f"{main_col}_{sub_col}".replace(".", "_").replace(" ", "_")
-
-            # ⭐ Normalize total grade column
-            if "grade" in combined and "300" in combined:
-                new_columns.append("overall_grade")
-            else:
-                new_columns.append(combined)
 
-    df.columns = new_columns
-    df.columns = df.columns.str.strip().str.lower()
+def iter_student_excel(file, chunk_size: int = INGEST_CHUNK_ROWS, on_header=None):
+    """Stream a workbook as DataFrame chunks of ``chunk_size`` rows.
+
+    Reads the first sheet with openpyxl's read-only iterator, so only one
+    chunk is held in memory at a time. Column names match
+    ``process_student_excel`` exactly. ``on_header(HeaderMapping)`` is
+    called once the header has been resolved.
+    """
+    wb = load_workbook(file, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = wb.worksheets[0]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+
+        top = [_header_cell(v) for v in next(rows, ())]
+        sub = [_header_cell(v) for v in next(rows, ())]
+        width = max(_trimmed_len(top), _trimmed_len(sub))
+        mapping = resolve_header(_multiindex_header(top, sub, width))
+        if on_header:
+            on_header(mapping)
+        columns = list(mapping.columns)
+
+        chunk = []
+        yielded = False
+        for row in rows:
+            row = list(row[:width]) + [None] * (width - len(row))
+            if all(v is None or v == "" for v in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=columns)
+                yielded = True
+                chunk = []
+        if chunk or not yielded:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        wb.close()
+
+
+def estimate_rows(file):
+    """Data rows declared by the sheet's dimension record (``None`` if absent).
+
+    Cheap (no rows are read) but only an estimate: the record can count
+    trailing blank rows, and some writers omit it.
+    """
+    wb = load_workbook(file, read_only=True, data_only=True, keep_links=False)
+    try:
+        max_row = wb.worksheets[0].max_row
+    finally:
+        wb.close()
+        file.seek(0)
+    return max(max_row - 2, 0) if max_row else None
+
+
+def normalize_columns(header) -> list:
+    return list(resolve_header(header).columns)
+
+
+# ─────────────────────────────────────────────────────
+# Two-row header, resolved the way pd.read_excel(header=[0, 1]) does
+# ─────────────────────────────────────────────────────
+def _header_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _trimmed_len(cells) -> int:
+    n = len(cells)
+    while n and cells[n - 1] == "":
+        n -= 1
+    return n
+
+
+def _multiindex_header(top, sub, width):
+    top = list(top[:width]) + [""] * (width - len(top))
+    sub = list(sub[:width]) + [""] * (width - len(sub))
+
+    # Merged group headers ("Grade" over Q1/Q2/Q3) only fill their first
+    # cell; pandas forward-fills the top row, then names blanks "Unnamed".
+    last = ""
+    for i, value in enumerate(top):
+        if value == "":
+            top[i] = last
+        else:
+            last = value
 
-    return df
+    return [
+        (t if t != "" else f"Unnamed: {i}_level_0", s if s != "" else f"Unnamed: {i}_level_1")
+        for i, (t, s) in enumerate(zip(top, sub))
+    ]
@@ -0,0 +1,20 @@
+"""Built Plotly figures, cached per table generation.
+
+Building a figure costs tens of milliseconds (plotly express most of all),
+far more than drawing it, and most charts only change when their table
+does. ``cached_figure`` keeps each built figure in the dataset cache under
+``(table, generation, "figure:<chart id>")``, so an unchanged chart costs a
+lookup on rerun and is rebuilt only after an upload or delete bumps the
+table.
+"""
+from services.database import db_cached
+
+
+def cached_figure(table_name: str, chart_id: str, build):
+    """``build()``'s figure for ``chart_id``, built once per table generation.
+
+    ``build`` may return ``None`` for a chart with nothing to draw; that is
+    cached as well. The figure is shared across sessions: draw it, never
+    modify it.
+    """
+    return db_cached(table_name, f"figure:{chart_id}", build)
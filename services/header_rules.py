@@ -0,0 +1,112 @@
+"""Header-mapping rules for the two-row export header.
+
+The rules are plain data (``HEADER_RULES``) evaluated top to bottom; the
+first rule whose patterns all match a column decides its name. Patterns
+are compiled once at import.
+
+Each column is matched on three strings:
+
+    main   top header cell, stripped and lower-cased     ("grade")
+    sub    second header cell, stripped and lower-cased  ("q1 /100", "unnamed: 3_level_1")
+    name   fallback name: ``main`` when ``sub`` is blank ("unnamed"), else
+           "main_sub"; dots and spaces become underscores
+
+Resolved mappings are cached by header signature (a hash of the raw
+two-row header), so repeat exports of the same template skip rule
+evaluation entirely.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+import pandas as pd
+
+HEADER_RULES = [
+    {"id": "grade_q1", "main": r"^grade$", "sub": r"q1", "target": "grade_q1"},
+    {"id": "grade_q2", "main": r"^grade$", "sub": r"q2", "target": "grade_q2"},
+    {"id": "grade_q3", "main": r"^grade$", "sub": r"q3", "target": "grade_q3"},
+    {"id": "grade_other", "main": r"^grade$", "target": "{sub_slash}"},
+    {"id": "overall_grade", "name": r"^(?=.*grade)(?=.*300)", "target": "overall_grade"},
+    {"id": "default", "target": "{name}"},
+]
+
+MAX_CACHED_HEADERS = 256
+
+
+@dataclass(frozen=True)
+class HeaderMapping:
+    signature: str
+    columns: tuple
+    decisions: tuple     # (raw main, raw sub, column, rule id) per column
+    cached: bool = False
+
+    def describe(self) -> str:
+        return "; ".join(
+            f"{main}/{sub} → {column} [{rule}]" if "unnamed" not in str(sub).lower()
+            else f"{main} → {column} [{rule}]"
+            for main, sub, column, rule in self.decisions
+        )
+
+    def table(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [(str(main), str(sub), column, rule) for main, sub, column, rule in self.decisions],
+            columns=["header", "subheader", "column", "rule"],
+        )
+
+
+def _compile(rules):
+    return [
+        (rule["id"], {field: re.compile(rule[field]) for field in ("main", "sub", "name") if field in rule},
+         rule["target"])
+        for rule in rules
+    ]
+
+
+_RULES = _compile(HEADER_RULES)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def header_signature(header) -> str:
+    raw = repr(tuple((str(main), str(sub)) for main, sub in header))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_header(header) -> HeaderMapping:
+    header = [(main, sub) for main, sub in header]
+    signature = header_signature(header)
+    with _cache_lock:
+        hit = _cache.get(signature)
+        if hit is not None:
+            _cache.move_to_end(signature)
+            return replace(hit, cached=True)
+
+    decisions = []
+    for main_raw, sub_raw in header:
+        column, rule_id = _apply_rules(main_raw, sub_raw)
+        decisions.append((main_raw, sub_raw, column, rule_id))
+    mapping = HeaderMapping(signature, tuple(d[2] for d in decisions), tuple(decisions))
+
+    with _cache_lock:
+        _cache[signature] = mapping
+        while len(_cache) > MAX_CACHED_HEADERS:
+            _cache.popitem(last=False)
+    return mapping
+
+
+def _apply_rules(main_raw, sub_raw):
+    main = str(main_raw).strip().lower()
+    sub = str(sub_raw).strip().lower()
+    if "unnamed" in sub:
+        name = main.replace(".", "_").replace(" ", "_")
+    else:
+        name = f"{main}_{sub}".replace(".", "_").replace(" ", "_")
+    fields = {"main": main, "sub": sub, "name": name}
+
+    for rule_id, patterns, target in _RULES:
+        if all(pattern.search(fields[field]) for field, pattern in patterns.items()):
+            column = target.format(name=name, sub_slash=sub.replace("/", "_"))
+            return column.strip().lower(), rule_id
+    return name.strip().lower(), "default"
@@ -0,0 +1,133 @@
+"""Server-side histogram binning.
+
+Figures are drawn from ``(counts, edges)`` pairs instead of raw values, so a
+histogram's payload is ``nbins`` numbers no matter how many students the
+table holds.
+
+Bins drawn from a typed table are kept in ``__histograms`` (one row per
+table, column and bin count: fixed edges plus counts) and maintained by
+``apply_histogram_delta`` as uploads replace and insert rows. While every
+new value falls inside the stored edges only the delta is binned; a value
+outside them drops the entry, which is rebuilt with fresh edges on next use.
+"""
+import json
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from services.backends import get_engine
+from services.write_lock import is_locked_error, no_wait
+
+HISTOGRAM_TABLE = "__histograms"
+
+
+def bin_counts(values, nbins: int):
+    """Equal-width bins over the finite ``values`` (numpy)."""
+    values = np.asarray(values, dtype="float64")
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return np.zeros(nbins, dtype="int64"), np.linspace(0, 1, nbins + 1)
+    counts, edges = np.histogram(values, bins=nbins)
+    return counts, edges
+
+
+def sql_bin_counts(conn, table_name: str, column: str, nbins: int, engine=None):
+    """Same bins as ``bin_counts``, computed in SQL by ``engine`` without loading rows."""
+    engine = engine or get_engine("sqlite")
+    low, high = engine.query(conn, table_name, f'SELECT MIN("{column}"), MAX("{column}") FROM {{t}}')[0]
+    if low is None:
+        return np.zeros(nbins, dtype="int64"), np.linspace(0, 1, nbins + 1)
+    if low == high:
+        # np.histogram widens a zero-width range to +-0.5 the same way.
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, nbins + 1)
+
+    bin_expr = engine.trunc(f'("{column}" - ?) / ?')
+    rows = engine.query(conn, table_name, (
+        f'SELECT {bin_expr} AS bin, COUNT(*) FROM {{t}} WHERE "{column}" IS NOT NULL GROUP BY bin'
+    ), (low, (high - low) / nbins))
+
+    counts = np.zeros(nbins, dtype="int64")
+    for bin_index, count in rows:
+        # The top edge is inclusive (as in np.histogram).
+        counts[min(int(bin_index), nbins - 1)] += count
+    return counts, edges
+
+
+def _bin_index(values, low: float, high: float, nbins: int):
+    # Same arithmetic as the SQL above, so delta counts line up with it.
+    values = np.asarray([v for v in values if v is not None], dtype="float64")
+    values = values[~np.isnan(values)]
+    index = ((values - low) / ((high - low) / nbins)).astype("int64")
+    return np.clip(index, 0, nbins - 1)
+
+
+def _ensure_histogram_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS [{HISTOGRAM_TABLE}] ("
+        "table_name TEXT NOT NULL, column_name TEXT NOT NULL, nbins INTEGER NOT NULL, "
+        "low REAL NOT NULL, high REAL NOT NULL, counts TEXT NOT NULL, "
+        "PRIMARY KEY (table_name, column_name, nbins))"
+    ))
+
+
+def stored_bin_counts(conn, table_name: str, column: str, nbins: int, engine=None):
+    """``sql_bin_counts``, stored on first use and read back afterwards."""
+    _ensure_histogram_table(conn)
+    row = conn.execute(text(
+        f"SELECT low, high, counts FROM [{HISTOGRAM_TABLE}] "
+        "WHERE table_name = :t AND column_name = :c AND nbins = :n"
+    ), {"t": table_name, "c": column, "n": nbins}).fetchone()
+    if row is not None:
+        return np.asarray(json.loads(row.counts), dtype="int64"), np.linspace(row.low, row.high, nbins + 1)
+
+    counts, edges = sql_bin_counts(conn, table_name, column, nbins, engine)
+    if counts.any():
+        try:
+            with no_wait(conn):
+                conn.execute(text(
+                    f"INSERT INTO [{HISTOGRAM_TABLE}] VALUES (:t, :c, :n, :low, :high, :counts)"
+                ), {"t": table_name, "c": column, "n": nbins, "low": float(edges[0]),
+                    "high": float(edges[-1]), "counts": json.dumps(counts.tolist())})
+        except OperationalError as e:
+            if not is_locked_error(e):
+                raise
+            # An upload is writing: draw these bins now, store them next time.
+    return counts, edges
+
+
+def apply_histogram_delta(conn, table_name: str, columns, removed: list, added: list):
+    """Move replaced (``removed``) and inserted (``added``) rows between stored bins."""
+    _ensure_histogram_table(conn)
+    columns = list(columns)
+    stored = conn.execute(text(
+        f"SELECT column_name, nbins, low, high, counts FROM [{HISTOGRAM_TABLE}] "
+        "WHERE table_name = :t"
+    ), {"t": table_name}).fetchall()
+    for column, nbins, low, high, counts in stored:
+        key = {"t": table_name, "c": column, "n": nbins}
+        if column not in columns:
+            continue
+        pos = columns.index(column)
+        plus = [r[pos] for r in added if r[pos] is not None]
+        if any(v < low or v > high for v in plus):
+            # Outside the stored edges: rebin from the table when next drawn.
+            conn.execute(text(
+                f"DELETE FROM [{HISTOGRAM_TABLE}] "
+                "WHERE table_name = :t AND column_name = :c AND nbins = :n"
+            ), key)
+            continue
+        counts = np.asarray(json.loads(counts), dtype="int64")
+        counts += np.bincount(_bin_index(plus, low, high, nbins), minlength=nbins)
+        counts -= np.bincount(_bin_index([r[pos] for r in removed], low, high, nbins),
+                              minlength=nbins)
+        conn.execute(text(
+            f"UPDATE [{HISTOGRAM_TABLE}] SET counts = :counts "
+            "WHERE table_name = :t AND column_name = :c AND nbins = :n"
+        ), {**key, "counts": json.dumps(counts.tolist())})
+
+
+def drop_histograms(conn, table_name: str):
+    _ensure_histogram_table(conn)
+    conn.execute(text(f"DELETE FROM [{HISTOGRAM_TABLE}] WHERE table_name = :t"), {"t": table_name})
@@ -0,0 +1,168 @@
+"""Background ingestion queue.
+
+Uploads are parsed and written on a small thread pool, outside the
+Streamlit script run, so the session that started an upload (and every
+other session) keeps browsing the existing datasets while it loads. WAL
+mode lets those readers run alongside the writer.
+
+Jobs live in this module, which is imported once per process, and expose
+progress counters the sidebar polls.
+"""
+import io
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from services.batch_import import batch_import
+from services.config import INGEST_WORKERS
+from services.database import db_find_upload, db_upload
+from services.excel_processor import estimate_rows, iter_student_excel
+from services.ledger import file_digest
+
+MAX_JOBS_KEPT = 50
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+@dataclass
+class IngestJob:
+    job_id: int
+    file_name: str
+    table_name: str
+    status: str = "queued"          # queued | running | done | skipped | failed
+    rows_total: Optional[int] = None
+    rows_parsed: int = 0
+    rows_written: int = 0
+    rows_unchanged: int = 0
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    message: str = ""
+    details: object = None          # per-file report table for batch jobs
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def fraction(self) -> float:
+        if self.status in ("done", "skipped"):
+            return 1.0
+        if not self.rows_total:
+            return 0.0
+        return min(self.rows_parsed / self.rows_total, 1.0)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if self.status != "running" or not self.rows_total or not self.rows_parsed:
+            return None
+        rate = self.rows_parsed / max(time.time() - self.started_at, 1e-6)
+        return max(self.rows_total - self.rows_parsed, 0) / rate
+
+
+def submit_upload(data: bytes, file_name: str, table_name: str) -> IngestJob:
+    job = _register(IngestJob(next(_ids), file_name, table_name))
+    _executor.submit(_run, job, data)
+    return job
+
+
+def submit_batch(files, table_name: str) -> IngestJob:
+    """Queue a multi-file import; ``files`` are ``(file_name, bytes)`` pairs."""
+    job = _register(IngestJob(next(_ids), f"{len(files)} files", table_name))
+    _executor.submit(_run_batch, job, files)
+    return job
+
+
+def get_jobs(job_ids) -> list:
+    with _lock:
+        return [_jobs[i] for i in job_ids if i in _jobs]
+
+
+def _register(job: IngestJob) -> IngestJob:
+    with _lock:
+        _jobs[job.job_id] = job
+        while len(_jobs) > MAX_JOBS_KEPT:
+            oldest = next(iter(_jobs.values()))
+            if oldest.active:
+                break
+            _jobs.popitem(last=False)
+    return job
+
+
+def _run(job: IngestJob, data: bytes):
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        file = io.BytesIO(data)
+        digest = file_digest(file)
+        previous = db_find_upload(digest, job.table_name)
+        if previous:
+            job.status = "skipped"
+            job.message = f"already in {job.table_name} (uploaded {previous['uploaded_at']})"
+            return
+
+        job.rows_total = estimate_rows(file)
+
+        def on_batch(report):
+            job.rows_written = report.written
+            job.rows_unchanged = report.unchanged
+
+        headers = []
+        report = db_upload(
+            _counted(iter_student_excel(file, on_header=headers.append), job), job.table_name,
+            file_digest=digest, file_name=job.file_name, progress=on_batch,
+        )
+        job.rows_total = report.rows
+        job.rows_parsed = report.rows
+        on_batch(report)
+        if headers:
+            job.details = headers[0].table()
+        job.status = "done"
+        job.message = (f"{report.rows} rows ({report.written} written, "
+                       f"{report.unchanged} unchanged, {report.rows_per_sec:,.0f} rows/s)"
+                       + (" · aggregates updated incrementally" if report.incremental else "")
+                       + (" · header template cached" if headers and headers[0].cached else "")
+                       + "".join(f" · {note}" for note in report.notes()))
+    except Exception as e:
+        job.status = "failed"
+        job.message = str(e)
+    finally:
+        job.finished_at = time.time()
+
+
+def _run_batch(job: IngestJob, files):
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        def on_file(result):
+            job.rows_parsed += result.rows
+
+        def on_batch(report):
+            job.rows_written = report.written
+            job.rows_unchanged = report.unchanged
+
+        report = batch_import(files, job.table_name, on_file=on_file, progress=on_batch)
+        job.rows_total = job.rows_parsed
+        job.rows_written = report.rows_written
+        job.rows_unchanged = report.rows_unchanged
+        job.details = report.table()
+        job.status = "done"
+        job.message = report.summary()
+    except Exception as e:
+        job.status = "failed"
+        job.message = str(e)
+    finally:
+        job.finished_at = time.time()
+
+
+def _counted(chunks, job: IngestJob):
+    for chunk in chunks:
+        job.rows_parsed += len(chunk)
+        yield chunk
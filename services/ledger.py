@@ -0,0 +1,50 @@
+"""Ledger of uploaded files, keyed by a SHA-256 of their content.
+
+Lets the sidebar recognize a workbook that is already loaded into a table
+(even from a fresh session, or re-exported under the same name) and skip it
+before any parsing happens.
+"""
+import hashlib
+
+from sqlalchemy import text
+
+LEDGER_TABLE = "__uploads"
+
+
+def file_digest(file, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(block_size), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def find_upload(conn, digest: str, table_name: str):
+    _ensure_ledger(conn)
+    row = conn.execute(text(
+        f"SELECT file_name, rows, uploaded_at FROM {LEDGER_TABLE} "
+        "WHERE digest = :d AND table_name = :t"
+    ), {"d": digest, "t": table_name}).fetchone()
+    return dict(row._mapping) if row else None
+
+
+def record_upload(conn, digest: str, table_name: str, file_name: str, rows: int):
+    _ensure_ledger(conn)
+    conn.execute(text(
+        f"INSERT OR REPLACE INTO {LEDGER_TABLE} (digest, table_name, file_name, rows, uploaded_at) "
+        "VALUES (:d, :t, :f, :r, CURRENT_TIMESTAMP)"
+    ), {"d": digest, "t": table_name, "f": file_name, "r": rows})
+
+
+def forget_table(conn, table_name: str):
+    _ensure_ledger(conn)
+    conn.execute(text(f"DELETE FROM {LEDGER_TABLE} WHERE table_name = :t"), {"t": table_name})
+
+
+def _ensure_ledger(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} ("
+        "digest TEXT NOT NULL, table_name TEXT NOT NULL, file_name TEXT, "
+        "rows INTEGER, uploaded_at TEXT, PRIMARY KEY (digest, table_name))"
+    ))
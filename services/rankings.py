@@ -0,0 +1,175 @@
+"""Rank and percentile index of a table's grades.
+
+Ranking a student, or listing each department's best students, used to
+sort the whole table. Instead each typed table gets ``__ranks__<table>``,
+one row per distinct grade of each ranked column, in two scopes: the whole
+table (``department = ''``) and each department. ``n`` counts the students
+with that grade; ``above`` and ``at_most`` count those with a higher grade
+and those with the same or a lower one. Both are running sums computed
+with window functions at upload time. From one row:
+
+    rank        above + 1                       (ties share a rank)
+    percentile  100 * at_most / (above + at_most)
+
+A student's ranks are a primary-key probe per column and scope, so
+``student_rank_sql`` adds them to the roll-number lookup as joins.
+``top_students`` reads only the rows whose grade has a department rank
+within the cut-off, joined from the index. Tables without a department
+column get the table-wide scope only.
+
+The index holds counts per grade, not per student, so it stays small (a
+few thousand rows for a million students). Uploads into the table update
+it from their delta (``apply_rank_delta``): they adjust the counts and
+recompute the running sums of the scopes they touched.
+"""
+from collections import Counter
+
+import pandas as pd
+from sqlalchemy import text
+
+from services.schema import GRADE_COLUMNS
+
+RANK_PREFIX = "__ranks__"
+
+# Scope of the whole table, next to one scope per department.
+ALL = ""
+
+
+def rank_table(table_name: str) -> str:
+    return f"{RANK_PREFIX}{table_name}"
+
+
+def ranked_columns(columns) -> list:
+    return [c for c in GRADE_COLUMNS if c in set(columns)]
+
+
+def has_rank_index(conn, table_name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :t"),
+        {"t": rank_table(table_name)},
+    ).fetchone() is not None
+
+
+def build_rank_index(conn, table_name: str, columns):
+    """(Re)build the rank index of ``table_name`` from its current rows."""
+    drop_rank_index(conn, table_name)
+    metrics = ranked_columns(columns)
+    if not metrics:
+        return
+    target = rank_table(table_name)
+    conn.execute(text(
+        f"CREATE TABLE [{target}] ("
+        "metric TEXT NOT NULL, department TEXT NOT NULL, value REAL NOT NULL, "
+        "n INTEGER NOT NULL, above INTEGER NOT NULL DEFAULT 0, at_most INTEGER NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (metric, department, value)) WITHOUT ROWID"
+    ))
+    # Without a department column only the table-wide scope is built.
+    department = "department" if "department" in columns else "NULL"
+    for metric in metrics:
+        # One GROUP BY per column; the table-wide counts are summed from the
+        # per-department ones rather than grouped again.
+        conn.execute(text(
+            f"WITH counts AS (SELECT {department} AS department, [{metric}] AS value, COUNT(*) AS n "
+            f"FROM [{table_name}] WHERE [{metric}] IS NOT NULL GROUP BY 1, 2), "
+            "scoped AS ("
+            "SELECT department, value, n FROM counts WHERE department IS NOT NULL "
+            "UNION ALL SELECT :all, value, SUM(n) FROM counts GROUP BY value) "
+            f"INSERT INTO [{target}] (metric, department, value, n, above, at_most) "
+            "SELECT :metric, department, value, n, "
+            "SUM(n) OVER (PARTITION BY department ORDER BY value DESC) - n, "
+            "SUM(n) OVER (PARTITION BY department ORDER BY value) FROM scoped"
+        ), {"metric": metric, "all": ALL})
+
+
+def apply_rank_delta(conn, table_name: str, columns, removed, added):
+    """Update the counts for one upload batch, then the touched running sums."""
+    target = rank_table(table_name)
+    metrics = ranked_columns(columns)
+    dept_pos = columns.index("department") if "department" in columns else None
+    deltas = Counter()
+    for rows, sign in ((removed, -1), (added, 1)):
+        for row in rows:
+            for metric in metrics:
+                value = row[columns.index(metric)]
+                if value is None:
+                    continue
+                deltas[(metric, ALL, value)] += sign
+                if dept_pos is not None and row[dept_pos] is not None:
+                    deltas[(metric, row[dept_pos], value)] += sign
+    changes = [(m, d, v, n) for (m, d, v), n in deltas.items() if n]
+    if not changes:
+        return
+    conn.exec_driver_sql(
+        f"INSERT INTO [{target}] (metric, department, value, n) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (metric, department, value) DO UPDATE SET n = n + excluded.n",
+        changes,
+    )
+    conn.exec_driver_sql(f"DELETE FROM [{target}] WHERE n <= 0")
+    for metric, department in sorted({(m, d) for m, d, _, _ in changes}):
+        conn.execute(text(
+            f"UPDATE [{target}] SET above = sums.above, at_most = sums.at_most FROM ("
+            "SELECT value, SUM(n) OVER (ORDER BY value DESC) - n AS above, "
+            f"SUM(n) OVER (ORDER BY value) AS at_most FROM [{target}] "
+            "WHERE metric = :metric AND department = :department) sums "
+            f"WHERE [{target}].metric = :metric AND [{target}].department = :department "
+            f"AND [{target}].value = sums.value"
+        ), {"metric": metric, "department": department})
+
+
+def rank_metrics(conn, table_name: str) -> list:
+    """Columns ranked in ``table_name``'s index; empty without an index."""
+    if not has_rank_index(conn, table_name):
+        return []
+    stored = {row[0] for row in conn.execute(
+        text(f"SELECT DISTINCT metric FROM [{rank_table(table_name)}]")
+    )}
+    return [c for c in GRADE_COLUMNS if c in stored]
+
+
+def student_rank_sql(table_name: str, metrics, departments: bool = True) -> str:
+    """The roll-number lookup with ``<col>_rank``, ``<col>_dept_rank`` and
+    ``<col>_percentile`` for each column in ``metrics``, as one query.
+
+    Without ``departments`` (no department column) ``<col>_dept_rank`` is NULL.
+    """
+    target = rank_table(table_name)
+    selected, joins = ["s.*"], []
+    for i, metric in enumerate(metrics):
+        scopes = [(f"a{i}", f"'{ALL}'")] + ([(f"d{i}", "s.department")] if departments else [])
+        for alias, scope in scopes:
+            joins.append(
+                f"LEFT JOIN [{target}] {alias} ON {alias}.metric = '{metric}' "
+                f"AND {alias}.department = {scope} AND {alias}.value = s.[{metric}]"
+            )
+        selected += [
+            f"a{i}.above + 1 AS {metric}_rank",
+            f"{f'd{i}.above + 1' if departments else 'NULL'} AS {metric}_dept_rank",
+            f"ROUND(100.0 * a{i}.at_most / (a{i}.above + a{i}.at_most), 1) AS {metric}_percentile",
+        ]
+    return (f"SELECT {', '.join(selected)} FROM [{table_name}] s {' '.join(joins)} "
+            "WHERE s.roll_no_ = :roll LIMIT 1")
+
+
+def top_students(conn, table_name: str, columns, top_n: int = 3) -> pd.DataFrame:
+    """``sql_top_students`` (services.analytics) answered from the index.
+
+    Ties go to the lower roll number, as there.
+    """
+    shown = ["department"] + [c for c in ("student_name",) if c in columns] + ["overall_grade"]
+    order = "s.overall_grade DESC" + (", s.roll_no_" if "roll_no_" in columns else "")
+    # Only grades with a department rank <= top_n (above < top_n) are looked
+    # up, so each department reads its winners plus any ties at the cut-off.
+    rows = conn.execute(text(
+        f"SELECT {', '.join(shown)} FROM ("
+        f"SELECT {', '.join('s.' + c for c in shown)}, "
+        f"ROW_NUMBER() OVER (PARTITION BY s.department ORDER BY {order}) AS r "
+        f"FROM [{rank_table(table_name)}] k JOIN [{table_name}] s "
+        "ON s.department = k.department AND s.overall_grade = k.value "
+        "WHERE k.metric = 'overall_grade' AND k.department != :all AND k.above < :n"
+        ") ranked WHERE r <= :n ORDER BY department, r"
+    ), {"all": ALL, "n": top_n}).fetchall()
+    return pd.DataFrame(rows, columns=shown)
+
+
+def drop_rank_index(conn, table_name: str):
+    conn.execute(text(f"DROP TABLE IF EXISTS [{rank_table(table_name)}]"))
@@ -0,0 +1,194 @@
+"""Column typing for uploaded tables.
+
+Types are decided once at ingest and recorded in ``__schema_registry`` so the
+read path gets numeric grades straight out of SQLite instead of re-parsing
+TEXT on every load.
+"""
+import pandas as pd
+from sqlalchemy import text, Column, MetaData, Table
+from sqlalchemy.types import INTEGER, REAL, TEXT
+
+SCHEMA_TABLE = "__schema_registry"
+
+GRADE_COLUMNS = ["grade_q1", "grade_q2", "grade_q3", "overall_grade"]
+
+# Stored as TEXT even when the sheet holds numbers (register numbers are
+# identifiers, not quantities, and must keep leading zeros).
+IDENTIFIER_COLUMNS = {
+    "student_name", "roll_no_", "register_no_", "department", "course", "year",
+}
+
+SQL_TYPES = {"INTEGER": INTEGER, "REAL": REAL, "TEXT": TEXT}
+
+
+def infer_schema(df: pd.DataFrame) -> dict:
+    schema = {}
+    for col in df.columns:
+        if col in GRADE_COLUMNS:
+            schema[col] = "REAL"
+        elif col in IDENTIFIER_COLUMNS:
+            schema[col] = "TEXT"
+        elif pd.api.types.is_bool_dtype(df[col]) or pd.api.types.is_integer_dtype(df[col]):
+            schema[col] = "INTEGER"
+        elif pd.api.types.is_float_dtype(df[col]):
+            schema[col] = "REAL"
+        else:
+            schema[col] = "TEXT"
+    return schema
+
+
+def coerce_to_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    out = {}
+    for col in df.columns:
+        sql_type = schema.get(col, "TEXT")
+        if sql_type == "REAL":
+            out[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        elif sql_type == "INTEGER":
+            out[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        else:
+            out[col] = _to_text(df[col])
+    return pd.DataFrame(out, index=df.index)
+
+
+def widen_schema(df: pd.DataFrame, schema: dict) -> dict:
+    """``schema`` with the numeric columns ``df`` does not fit widened.
+
+    Types are inferred from the first chunk of an upload; a later one may
+    hold fractions in an INTEGER column (widened to REAL) or text in a
+    numeric one (widened to TEXT). Grades stay REAL; see ``unparsed_values``.
+    """
+    wider = dict(schema)
+    for col in df.columns:
+        sql_type = schema.get(col)
+        if sql_type not in ("INTEGER", "REAL") or col in GRADE_COLUMNS:
+            continue
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values):
+            numbers = values
+        else:
+            numbers = pd.to_numeric(values, errors="coerce")
+            if (numbers.isna() & values.notna()).any():
+                wider[col] = "TEXT"
+                continue
+        if sql_type == "INTEGER" and (numbers.dropna() % 1 != 0).any():
+            wider[col] = "REAL"
+    return wider
+
+
+def unparsed_values(df: pd.DataFrame, schema: dict) -> dict:
+    """``{column: count}`` of values ``coerce_to_schema`` stores as NULL."""
+    counts = {}
+    for col in df.columns:
+        if schema.get(col) not in ("INTEGER", "REAL") or pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        numbers = pd.to_numeric(df[col], errors="coerce")
+        n = int((numbers.isna() & df[col].notna()).sum())
+        if n:
+            counts[col] = n
+    return counts
+
+
+def add_columns(conn, table_name: str, schema: dict, columns: dict) -> dict:
+    """Add ``columns`` (``{name: type}``) to ``table_name``; returns their types.
+
+    Tables created before typed uploads get TEXT columns, like the rest.
+    """
+    typed = load_schema(conn, table_name) is not None
+    columns = {col: sql_type if typed else "TEXT" for col, sql_type in columns.items()}
+    for col, sql_type in columns.items():
+        conn.execute(text(f"ALTER TABLE [{table_name}] ADD COLUMN [{col}] {sql_type}"))
+    if typed:
+        save_schema(conn, table_name, {**schema, **columns})
+    return columns
+
+
+def retype_table(conn, table_name: str, schema: dict, new_schema: dict):
+    """Rebuild ``table_name`` with the column types of ``new_schema``.
+
+    SQLite cannot change a column's type in place. The rows are copied into
+    a new table under their rowids (which the search index refers to), its
+    indexes are recreated, and numbers in columns that become TEXT are
+    written as ``coerce_to_schema`` would have (``1921.0`` -> ``"1921"``).
+    """
+    indexes = [sql for (sql,) in conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"
+    ), {"t": table_name})]
+    staging = f"__retype__{table_name}"
+    conn.execute(text(f"DROP TABLE IF EXISTS [{staging}]"))
+    create_table(conn, staging, new_schema)
+    selected = []
+    for col, sql_type in new_schema.items():
+        if sql_type == "TEXT" and schema.get(col) != "TEXT":
+            selected.append(
+                f"CASE WHEN typeof([{col}]) = 'real' AND [{col}] = CAST([{col}] AS INTEGER) "
+                f"THEN CAST(CAST([{col}] AS INTEGER) AS TEXT) ELSE CAST([{col}] AS TEXT) END"
+            )
+        else:
+            selected.append(f"[{col}]")
+    names = ", ".join(f"[{c}]" for c in new_schema)
+    conn.execute(text(
+        f"INSERT INTO [{staging}] (rowid, {names}) "
+        f"SELECT rowid, {', '.join(selected)} FROM [{table_name}]"
+    ))
+    conn.execute(text(f"DROP TABLE [{table_name}]"))
+    conn.execute(text(f"ALTER TABLE [{staging}] RENAME TO [{table_name}]"))
+    for sql in indexes:
+        conn.exec_driver_sql(sql)
+    save_schema(conn, table_name, new_schema)
+
+
+def create_table(conn, table_name: str, schema: dict):
+    metadata = MetaData()
+    columns = [Column(col, SQL_TYPES[sql_type]) for col, sql_type in schema.items()]
+    Table(table_name, metadata, *columns)
+    metadata.create_all(conn)
+
+
+def save_schema(conn, table_name: str, schema: dict):
+    _ensure_registry(conn)
+    conn.execute(text(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = :t"), {"t": table_name})
+    conn.execute(
+        text(f"INSERT INTO {SCHEMA_TABLE} (table_name, column_name, sql_type, position) "
+             "VALUES (:t, :c, :ty, :p)"),
+        [{"t": table_name, "c": col, "ty": sql_type, "p": i}
+         for i, (col, sql_type) in enumerate(schema.items())],
+    )
+
+
+def load_schema(conn, table_name: str):
+    _ensure_registry(conn)
+    rows = conn.execute(
+        text(f"SELECT column_name, sql_type FROM {SCHEMA_TABLE} "
+             "WHERE table_name = :t ORDER BY position"),
+        {"t": table_name},
+    ).fetchall()
+    return {col: sql_type for col, sql_type in rows} or None
+
+
+def drop_schema(conn, table_name: str):
+    _ensure_registry(conn)
+    conn.execute(text(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = :t"), {"t": table_name})
+
+
+def _ensure_registry(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+        "table_name TEXT NOT NULL, column_name TEXT NOT NULL, "
+        "sql_type TEXT NOT NULL, position INTEGER NOT NULL, "
+        "PRIMARY KEY (table_name, column_name))"
+    ))
+
+
+def _to_text(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_string_dtype(series):
+        return series.astype(object).where(series.notna(), None)
+
+    def as_text(value):
+        if pd.isna(value):
+            return None
+        if isinstance(value, float) and value.is_integer():
+            # Excel hands back whole numbers as floats: 1921000001.0 -> "1921000001"
+            return str(int(value))
+        return str(value)
+
+    return series.map(as_text).astype(object)
@@ -0,0 +1,257 @@
+"""Student search over name, roll number and register number.
+
+Each table gets ``__search__<table>``, an FTS5 index with the trigram
+tokenizer over the table's own rows (external content, so the text is not
+stored twice). A first upload builds it; later uploads update it with just
+the rows they replace and insert (``apply_search_delta``).
+
+Trigrams match any substring of three or more characters, so prefixes
+("21CS00"), infixes ("0042") and partial names ("kumar") all hit the
+index. A query is answered in two passes, both top-k by FTS5's bm25 rank:
+
+    strict   every term must appear              "anand 21cs" -> both
+    fuzzy    any of the query's trigrams may     "aannd" still finds "anand"
+
+Single-term queries first take roll/register numbers starting with the
+term (a range scan on their lookup indexes); terms shorter than three
+characters can only match that way.
+"""
+import re
+from collections import Counter
+
+from sqlalchemy import text
+
+SEARCH_PREFIX = "__search__"
+SEARCH_COLUMNS = ["student_name", "roll_no_", "register_no_"]
+
+
+# bm25 ranking scores every match, so it is used only when a query matches
+# at most this many rows; broader queries return the first rows in upload order.
+RANK_CANDIDATES = 2000
+# The fuzzy pass ignores trigrams found in more than this share of rows
+# ("stu" in every "Student ..."), which would otherwise match the whole table.
+COMMON_TRIGRAM_SHARE = 0.05
+# Terms checked on the candidates (rather than in FTS) look at no more than
+# this many of them, which bounds a keystroke's cost on very broad queries.
+FILTER_CANDIDATES = 20000
+
+
+def search_table(table_name: str) -> str:
+    return f"{SEARCH_PREFIX}{table_name}"
+
+
+def _trigram_table(table_name: str) -> str:
+    return f"{SEARCH_PREFIX}{table_name}_trigrams"
+
+
+def has_search_index(conn, table_name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :t"),
+        {"t": search_table(table_name)},
+    ).fetchone() is not None
+
+
+def build_search_index(conn, table_name: str, columns):
+    """(Re)build the trigram index of ``table_name`` from its current rows."""
+    indexed = [c for c in SEARCH_COLUMNS if c in set(columns)]
+    drop_search_index(conn, table_name)
+    if not indexed:
+        return
+    target = search_table(table_name)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE [{target}] USING fts5("
+        f"{', '.join(indexed)}, content='{_quoted(table_name)}', content_rowid='rowid', "
+        "tokenize='trigram')"
+    ))
+    conn.execute(text(f"INSERT INTO [{target}] ([{target}]) VALUES ('rebuild')"))
+    # Per-trigram document counts, for pruning common trigrams. Copied out of
+    # fts5vocab (which can only scan the whole vocabulary) into a keyed table.
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE temp.[{target}_vocab] USING fts5vocab(main, [{target}], 'row')"
+    ))
+    conn.execute(text(
+        f"CREATE TABLE [{_trigram_table(table_name)}] "
+        "(term TEXT PRIMARY KEY, docs INTEGER NOT NULL) WITHOUT ROWID"
+    ))
+    conn.execute(text(
+        f"INSERT INTO [{_trigram_table(table_name)}] SELECT term, doc FROM temp.[{target}_vocab]"
+    ))
+    conn.execute(text(f"DROP TABLE temp.[{target}_vocab]"))
+
+
+def drop_search_index(conn, table_name: str):
+    conn.execute(text(f"DROP TABLE IF EXISTS [{_trigram_table(table_name)}]"))
+    conn.execute(text(f"DROP TABLE IF EXISTS [{search_table(table_name)}]"))
+
+
+def apply_search_delta(conn, table_name: str, columns, removed: list, removed_rowids: list,
+                       added: list, first_rowid: int):
+    """Index one upload batch: ``removed`` rows leave, rows from ``first_rowid`` on enter."""
+    target = search_table(table_name)
+    columns = list(columns)
+    indexed = [row[1] for row in conn.execute(text(f"PRAGMA table_info([{target}])"))]
+    positions = [columns.index(c) for c in indexed]
+    names = ", ".join(f"[{c}]" for c in indexed)
+    slots = ", ".join("?" for _ in indexed)
+    if removed:
+        # External content: FTS5 needs the old values to unindex a row.
+        conn.exec_driver_sql(
+            f"INSERT INTO [{target}] ([{target}], rowid, {names}) VALUES ('delete', ?, {slots})",
+            [(rowid, *(row[p] for p in positions)) for rowid, row in zip(removed_rowids, removed)],
+        )
+    if added:
+        conn.exec_driver_sql(
+            f"INSERT INTO [{target}] (rowid, {names}) "
+            f"SELECT rowid, {names} FROM [{table_name}] WHERE rowid >= ?",
+            (first_rowid,),
+        )
+
+    docs = Counter()
+    for sign, rows in ((1, added), (-1, removed)):
+        for row in rows:
+            for gram in _row_trigrams(row[p] for p in positions):
+                docs[gram] += sign
+    changed = [(gram, n) for gram, n in docs.items() if n]
+    if changed:
+        conn.exec_driver_sql(
+            f"INSERT INTO [{_trigram_table(table_name)}] (term, docs) VALUES (?, ?) "
+            "ON CONFLICT (term) DO UPDATE SET docs = docs + excluded.docs",
+            changed,
+        )
+    gone = [(gram,) for gram, n in docs.items() if n < 0]
+    if gone:
+        conn.exec_driver_sql(
+            f"DELETE FROM [{_trigram_table(table_name)}] WHERE term = ? AND docs <= 0", gone
+        )
+
+
+def _row_trigrams(values) -> set:
+    # As the trigram tokenizer sees a row: every 3-character run of each
+    # value, case-folded; a row counts once per trigram.
+    grams = set()
+    for value in values:
+        if value is not None:
+            value = str(value).lower()
+            grams.update(value[i:i + 3] for i in range(len(value) - 2))
+    return grams
+
+
+def _terms(query: str) -> list:
+    return [t for t in re.split(r"\s+", query.strip()) if t]
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _trigrams(query: str) -> list:
+    squeezed = re.sub(r"\s+", " ", query.strip().lower())
+    return sorted({squeezed[i:i + 3] for i in range(len(squeezed) - 2)} - {"   "})
+
+
+def search_students(conn, table_name: str, query: str, limit: int = 10) -> list:
+    """Top ``limit`` rows of ``table_name`` matching ``query``, best first."""
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    results, seen = [], set()
+
+    def add(rows):
+        for row in rows:
+            if len(results) >= limit:
+                return
+            key = _row_key(row)
+            if key not in seen:
+                seen.add(key)
+                results.append(row)
+
+    if len(terms) == 1:
+        # A roll/register number prefix ranks first and is an index range scan.
+        for prefix in dict.fromkeys([terms[0], terms[0].upper()]):
+            add(_prefix_search(conn, table_name, prefix, limit))
+    long_terms = [t for t in terms if len(t) >= 3]
+    if len(results) >= limit or not long_terms:
+        return results
+
+    trigrams = _trigrams(query)
+    docs, rows = _trigram_docs(conn, table_name, trigrams)
+    common = {g for g in trigrams if docs.get(g, 0) > rows * COMMON_TRIGRAM_SHARE}
+    # A term with a trigram no row contains cannot match (usually a typo);
+    # it is left to the fuzzy pass.
+    possible = [t for t in long_terms if all(docs.get(g) for g in _trigrams(t))]
+    if possible:
+        # A term made only of common trigrams ("student") matches nearly every
+        # row; it is checked on the candidates instead of intersected in FTS.
+        selective = [t for t in possible if not set(_trigrams(t)) <= common] or possible
+        # Terms too short for trigrams are checked on the candidates as well.
+        filters = [t for t in terms if t not in selective and (t in possible or len(t) < 3)]
+        add(_match(conn, table_name, " AND ".join(_phrase(t) for t in selective), limit, filters))
+
+    rare = [g for g in trigrams if " " not in g and docs.get(g) and g not in common]
+    if len(results) < limit and rare:
+        add(_match(conn, table_name, " OR ".join(_phrase(g) for g in rare), limit))
+    return results
+
+
+def _row_key(row: dict):
+    return row.get("roll_no_"), row.get("register_no_"), row.get("student_name")
+
+
+def _match(conn, table_name: str, match: str, limit: int, filters=()) -> list:
+    target = search_table(table_name)
+    matched = conn.execute(text(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM [{target}] WHERE [{target}] MATCH :match LIMIT :cap)"
+    ), {"match": match, "cap": RANK_CANDIDATES}).scalar()
+    if not matched:
+        return []
+
+    columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info([{target}])"))]
+    params = {"match": match, "limit": limit,
+              "candidates": FILTER_CANDIDATES if filters else limit}
+    where = []
+    for i, term in enumerate(filters):
+        params[f"t{i}"] = term.lower()
+        where.append("(" + " OR ".join(f"instr(lower(s.[{c}]), :t{i})" for c in columns) + ")")
+    where = f"WHERE {' AND '.join(where)} " if where else ""
+    ranked = matched < RANK_CANDIDATES
+    rows = conn.execute(text(
+        f"SELECT s.* FROM (SELECT rowid{', rank' if ranked else ''} FROM [{target}] "
+        f"WHERE [{target}] MATCH :match {'ORDER BY rank ' if ranked else ''}LIMIT :candidates) f "
+        f"JOIN [{table_name}] s ON s.rowid = f.rowid {where}"
+        f"{'ORDER BY f.rank ' if ranked else ''}LIMIT :limit"
+    ), params)
+    return [dict(r._mapping) for r in rows]
+
+
+def _trigram_docs(conn, table_name: str, trigrams: list):
+    """``({trigram: rows containing it}, approximate row count)``."""
+    rows = conn.execute(text(f"SELECT MAX(rowid) FROM [{table_name}]")).scalar() or 0
+    if not trigrams:
+        return {}, rows
+    params = {f"g{i}": g for i, g in enumerate(trigrams)}
+    docs = dict(conn.execute(text(
+        f"SELECT term, docs FROM [{_trigram_table(table_name)}] "
+        f"WHERE term IN ({', '.join(':' + k for k in params)})"
+    ), params).fetchall())
+    return docs, rows
+
+
+def _prefix_search(conn, table_name: str, prefix: str, limit: int) -> list:
+    columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info([{table_name}])"))}
+    results = []
+    for col in ("roll_no_", "register_no_"):
+        if col not in columns or len(results) >= limit:
+            continue
+        # Range scan, so the lookup index on the column is used.
+        rows = conn.execute(text(
+            f"SELECT * FROM [{table_name}] WHERE [{col}] >= :low AND [{col}] < :high "
+            f"ORDER BY [{col}] LIMIT :limit"
+        ), {"low": prefix, "high": prefix + "\U0010ffff", "limit": limit - len(results)})
+        results.extend(dict(r._mapping) for r in rows)
+    return results
+
+
+def _quoted(value: str) -> str:
+    # Inside an SQL string literal (FTS5 options take table names as strings).
+    return value.replace("'", "''")
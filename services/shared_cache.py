@@ -0,0 +1,102 @@
+"""Loaded table frames shared by every server process on the host.
+
+With several server processes behind a load balancer, each one would read,
+derive and compact every table itself and keep a private copy of the
+result. Instead, the first process to load a frame writes it as an Arrow IPC
+file, ``<SHARED_CACHE_DIR>/<table>/<version>-<kind>.arrow``, stamped with
+the table's persisted version and the database's id (see services.versions).
+The other processes
+memory-map that file. Its numeric, categorical and string buffers are then
+served from the OS page cache, once for the whole host, instead of being
+decoded into each process.
+
+Files are written under a temporary name and renamed into place, as
+snapshots are. Writing a version removes the table's older files; a
+process that still maps an old file keeps reading it until it drops it.
+
+pyarrow is optional: without it, or with ``SAVEETHA_SHARED_CACHE_DIR``
+empty, every process loads its own frames.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+from services.compaction import MemoryReport
+from services.config import SHARED_CACHE_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+
+def shared_cache_enabled() -> bool:
+    return pa is not None and bool(SHARED_CACHE_DIR)
+
+
+def load_shared(table_name: str, version: int, database: str, kind: str):
+    """``(frame, MemoryReport)`` from the shared file; ``None`` if there is none yet."""
+    path = _path(table_name, version, kind)
+    try:
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if (table.schema.metadata or {}).get(b"saveetha.database") != database.encode():
+        # Written for another database file that had the same table version.
+        return None
+    report = None
+    raw = (table.schema.metadata or {}).get(b"saveetha.memory_report")
+    if raw:
+        report = MemoryReport(**json.loads(raw))
+        report.columns = {col: tuple(dtypes) for col, dtypes in report.columns.items()}
+    # split_blocks keeps each column on its own mapped buffer instead of
+    # consolidating (copying) columns of one dtype into a 2-D block.
+    return table.to_pandas(split_blocks=True), report
+
+
+def store_shared(table_name: str, version: int, database: str, kind: str, df: pd.DataFrame,
+                 report: MemoryReport = None):
+    """Publish ``df`` for the other processes; failures only cost them a load."""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"saveetha.database"] = database.encode()
+        if report is not None:
+            metadata[b"saveetha.memory_report"] = json.dumps(report.__dict__).encode()
+        table = table.replace_schema_metadata(metadata)
+        path = _path(table_name, version, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    except Exception:
+        return
+    _remove_older(table_name, version)
+
+
+def drop_shared(table_name: str):
+    shutil.rmtree(os.path.join(SHARED_CACHE_DIR, table_name), ignore_errors=True)
+
+
+def _path(table_name: str, version: int, kind: str) -> str:
+    # Projections ("rows:col,col,...") can be long; hash them into the name.
+    digest = hashlib.sha1(kind.encode()).hexdigest()[:12]
+    return os.path.join(SHARED_CACHE_DIR, table_name, f"{version}-{digest}.arrow")
+
+
+def _remove_older(table_name: str, version: int):
+    for path in glob.glob(os.path.join(SHARED_CACHE_DIR, table_name, "*.arrow")):
+        stored = os.path.basename(path).split("-", 1)[0]
+        if stored.isdigit() and int(stored) < version:
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by a reader on a platform that forbids removal.
+                pass
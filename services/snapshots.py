@@ -0,0 +1,90 @@
+"""Columnar Arrow snapshots of uploaded tables.
+
+SQLite stays the source of truth. Next to it, every typed table gets an
+Arrow IPC file, ``<SNAPSHOT_DIR>/<table>.arrow``, stamped with the table's
+persisted version and the database's id (versions restart in a new
+database file). Loads memory-map the file and decode only the projected
+columns, skipping SQLite row decoding entirely. A missing or stale snapshot
+is rebuilt from SQLite on the next load.
+
+pyarrow is optional: without it every load goes through SQLite.
+"""
+import os
+
+import pandas as pd
+from sqlalchemy import text
+
+from services.config import SNAPSHOT_DIR, INGEST_CHUNK_ROWS
+from services.versions import database_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+
+def snapshots_enabled() -> bool:
+    return pa is not None
+
+
+def snapshot_path(table_name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{table_name}.arrow")
+
+
+def write_snapshot(conn, table_name: str, schema: dict, version: int):
+    """Stream ``table_name`` out of SQLite into a fresh snapshot file."""
+    arrow_types = {"INTEGER": pa.int64(), "REAL": pa.float64(), "TEXT": pa.string()}
+    arrow_schema = pa.schema(
+        [(col, arrow_types[sql_type]) for col, sql_type in schema.items()],
+        metadata={"table": table_name, "version": str(version), "database": database_id(conn)},
+    )
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(table_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    columns = ", ".join(f"[{c}]" for c in schema)
+    chunks = pd.read_sql_query(
+        text(f"SELECT {columns} FROM [{table_name}] ORDER BY rowid"),
+        conn, chunksize=INGEST_CHUNK_ROWS,
+    )
+    with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, arrow_schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=arrow_schema, preserve_index=False))
+    # Readers see either the old file or the complete new one.
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(table_name: str, version: int, database: str, columns=None):
+    """Memory-mapped Arrow table; ``None`` when the file is missing or stale.
+
+    ``database`` is the reader's ``database_id``.
+    """
+    path = snapshot_path(table_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        reader = ipc.open_file(pa.memory_map(path, "r"))
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadata = reader.schema.metadata or {}
+    if (metadata.get(b"version") != str(version).encode()
+            or metadata.get(b"database") != database.encode()):
+        return None
+    table = reader.read_all()
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    return table
+
+
+def read_snapshot(table_name: str, version: int, database: str, columns=None):
+    """The snapshot decoded into a DataFrame; ``None`` when missing or stale."""
+    table = open_snapshot(table_name, version, database, columns)
+    return table.to_pandas() if table is not None else None
+
+
+def delete_snapshot(table_name: str):
+    try:
+        os.remove(snapshot_path(table_name))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,72 @@
+"""SQL for the paginated "All Students" grid.
+
+Filters, sort and LIMIT/OFFSET are all applied inside SQLite, so only the
+rows of the requested page are ever decoded into pandas.
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+from services.config import PASS_MARK
+from services.schema import GRADE_COLUMNS
+
+
+@dataclass
+class StudentQuery:
+    departments: list = field(default_factory=list)
+    years: list = field(default_factory=list)
+    result: Optional[str] = None           # "Pass", "Fail" or None for both
+    grade_min: Optional[float] = None
+    grade_max: Optional[float] = None
+    sort_by: str = "roll_no_"
+    descending: bool = False
+    page: int = 1
+    page_size: int = 50
+
+
+def build_page_query(table_name: str, columns: list, query: StudentQuery, typed: bool = True):
+    """Return ``(page_sql, count_sql, params)`` for ``query``.
+
+    ``columns`` are the table's real columns; anything else (sort column,
+    filters on missing columns) is ignored rather than interpolated.
+    """
+    def expr(col):
+        # Legacy all-TEXT tables compare grades as text unless cast.
+        return f"CAST([{col}] AS REAL)" if col in GRADE_COLUMNS and not typed else f"[{col}]"
+
+    where, params = [], {}
+
+    for col, values in (("department", query.departments), ("year", query.years)):
+        if values and col in columns:
+            names = [f"{col}_{i}" for i in range(len(values))]
+            where.append(f"[{col}] IN ({', '.join(':' + n for n in names)})")
+            params.update(zip(names, values))
+
+    if "overall_grade" in columns:
+        grade = expr("overall_grade")
+        if query.result == "Pass":
+            where.append(f"{grade} >= :pass_mark")
+            params["pass_mark"] = PASS_MARK
+        elif query.result == "Fail":
+            where.append(f"({grade} < :pass_mark OR {grade} IS NULL)")
+            params["pass_mark"] = PASS_MARK
+        if query.grade_min is not None:
+            where.append(f"{grade} >= :grade_min")
+            params["grade_min"] = query.grade_min
+        if query.grade_max is not None:
+            where.append(f"{grade} <= :grade_max")
+            params["grade_max"] = query.grade_max
+
+    where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+
+    sort_by = query.sort_by if query.sort_by in columns else None
+    order = "DESC" if query.descending else "ASC"
+    # rowid keeps the order stable across pages when sort values tie.
+    order_sql = f" ORDER BY {expr(sort_by)} {order}, rowid" if sort_by else " ORDER BY rowid"
+
+    page_size = max(1, int(query.page_size))
+    params["limit"] = page_size
+    params["offset"] = (max(1, int(query.page)) - 1) * page_size
+
+    page_sql = f"SELECT * FROM [{table_name}]{where_sql}{order_sql} LIMIT :limit OFFSET :offset"
+    count_sql = f"SELECT COUNT(*) FROM [{table_name}]{where_sql}"
+    return page_sql, count_sql, params
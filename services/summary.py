@@ -0,0 +1,307 @@
+"""Per-dataset aggregate tables.
+
+Every typed upload also writes ``__summary__<table>``, one row per scope:
+
+    scope        name            what it holds
+    ─────────────────────────────────────────────────────────────
+    meta         course          first course value (``label``)
+    meta         pass_mark       pass mark the counts were built with (``total``)
+    overall      overall_grade   whole-table KPIs
+    department   <department>    per-department overall_grade stats
+    exam         grade_q1 ...    per-exam stats
+
+so the header, KPI cards and Overview aggregates are read from a handful of
+rows instead of being recomputed over the student table on every rerun.
+
+Every stat is a running aggregate (counts, sum, sum of squares, min, max,
+pass count), so ``apply_summary_delta`` can fold an upload's inserted and
+replaced rows in without rescanning the table.
+"""
+import pandas as pd
+from sqlalchemy import text
+
+from services.backends import get_engine
+from services.config import PASS_MARK
+from services.schema import GRADE_COLUMNS
+
+SUMMARY_PREFIX = "__summary__"
+
+SUMMARY_COLUMNS = [
+    "scope", "name", "label", "n_rows", "n_graded",
+    "total", "sum_sq", "min_grade", "max_grade", "n_pass",
+]
+
+EXAM_COLUMNS = [c for c in GRADE_COLUMNS if c != "overall_grade"]
+
+
+def summary_table(table_name: str) -> str:
+    return f"{SUMMARY_PREFIX}{table_name}"
+
+
+class DatasetSummary:
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    def _scope(self, scope: str) -> pd.DataFrame:
+        return self.frame[self.frame["scope"] == scope]
+
+    @property
+    def pass_mark(self):
+        meta = self._scope("meta")
+        mark = meta.loc[meta["name"] == "pass_mark", "total"]
+        return float(mark.iloc[0]) if not mark.empty else None
+
+    @property
+    def is_current(self) -> bool:
+        """Built with today's pass mark and layout (else it must be rebuilt)."""
+        return self.pass_mark == PASS_MARK and "sum_sq" in self.frame.columns
+
+    @property
+    def has_grades(self) -> bool:
+        return not self._scope("overall").empty
+
+    @property
+    def course(self) -> str:
+        course = self._scope("meta")
+        course = course.loc[course["name"] == "course", "label"]
+        return str(course.iloc[0]) if not course.empty else "—"
+
+    def kpis(self) -> dict:
+        row = self._scope("overall").iloc[0]
+        return {
+            "total": int(row["n_rows"]),
+            "avg": round(row["total"] / row["n_graded"], 1) if row["n_graded"] else float("nan"),
+            "top": row["max_grade"],
+            "low": row["min_grade"],
+            "pass_rate": round(row["n_pass"] / row["n_rows"] * 100, 1) if row["n_rows"] else 0.0,
+            "passed": int(row["n_pass"]),
+            "failed": int(row["n_rows"] - row["n_pass"]),
+            "std": round(_std(row), 1) if "sum_sq" in row else float("nan"),
+        }
+
+    def departments(self) -> pd.DataFrame:
+        depts = self._scope("department")
+        return pd.DataFrame({
+            "department": depts["name"].to_numpy(),
+            "students": depts["n_rows"].astype(int).to_numpy(),
+            "overall_grade": (depts["total"] / depts["n_graded"]).to_numpy(),
+            "min_grade": depts["min_grade"].to_numpy(),
+            "max_grade": depts["max_grade"].to_numpy(),
+            "passed": depts["n_pass"].astype(int).to_numpy(),
+            "failed": (depts["n_rows"] - depts["n_pass"]).astype(int).to_numpy(),
+        })
+
+    def exam_means(self) -> pd.Series:
+        exams = self._scope("exam")
+        return pd.Series((exams["total"] / exams["n_graded"]).to_numpy(), index=exams["name"].to_numpy())
+
+
+def _std(row) -> float:
+    """Sample standard deviation from the running count, sum and sum of squares."""
+    n = row["n_graded"]
+    if not n or n < 2 or pd.isna(row["sum_sq"]):
+        return float("nan")
+    return max(row["sum_sq"] - row["total"] ** 2 / n, 0.0) ** 0.5 / (n - 1) ** 0.5
+
+
+def build_summary(conn, table_name: str, columns, engine=None):
+    """(Re)build the summary of ``table_name`` with SQL aggregates run by ``engine``."""
+    engine = engine or get_engine("sqlite")
+    columns = set(columns)
+    rows = [("meta", "pass_mark", None, None, None, PASS_MARK, None, None, None, None)]
+
+    def query(sql, params=()):
+        return engine.query(conn, table_name, sql, params)
+
+    if "course" in columns:
+        course = query(f"SELECT course FROM {{t}} {engine.in_order} LIMIT 1")
+        rows.append(("meta", "course", course[0][0] if course else None,
+                     None, None, None, None, None, None, None))
+
+    if "overall_grade" in columns:
+        stats = (
+            "COUNT(*), COUNT(overall_grade), SUM(overall_grade), "
+            "SUM(overall_grade * overall_grade), MIN(overall_grade), MAX(overall_grade), "
+            "COALESCE(SUM(CASE WHEN overall_grade >= ? THEN 1 ELSE 0 END), 0)"
+        )
+        overall = query(f"SELECT {stats} FROM {{t}}", (PASS_MARK,))[0]
+        rows.append(("overall", "overall_grade", None, *overall))
+
+        if "department" in columns:
+            for dept, *dept_stats in query(
+                f"SELECT department, {stats} FROM {{t}} "
+                "WHERE department IS NOT NULL GROUP BY department ORDER BY department",
+                (PASS_MARK,),
+            ):
+                rows.append(("department", dept, None, *dept_stats))
+
+    exams = [c for c in EXAM_COLUMNS if c in columns]
+    if exams:
+        select = ", ".join(
+            f"COUNT({c}), SUM({c}), SUM({c} * {c}), MIN({c}), MAX({c})" for c in exams
+        )
+        values = query(f"SELECT COUNT(*), {select} FROM {{t}}")[0]
+        n_rows, values = values[0], values[1:]
+        for i, col in enumerate(exams):
+            n_graded, total, sum_sq, low, high = values[i * 5:i * 5 + 5]
+            rows.append(("exam", col, None, n_rows, n_graded, total, sum_sq, low, high, None))
+
+    target = summary_table(table_name)
+    conn.execute(text(f"DROP TABLE IF EXISTS [{target}]"))
+    conn.execute(text(
+        f"CREATE TABLE [{target}] ("
+        "scope TEXT NOT NULL, name TEXT, label TEXT, n_rows INTEGER, n_graded INTEGER, "
+        "total REAL, sum_sq REAL, min_grade REAL, max_grade REAL, n_pass INTEGER)"
+    ))
+    if rows:
+        conn.execute(
+            text(f"INSERT INTO [{target}] VALUES "
+                 "(:scope, :name, :label, :n_rows, :n_graded, :total, :sum_sq, "
+                 ":min_grade, :max_grade, :n_pass)"),
+            [dict(zip(SUMMARY_COLUMNS, row)) for row in rows],
+        )
+
+
+# ─────────────────────────────────────────────────────
+# Incremental maintenance
+# ─────────────────────────────────────────────────────
+def _partial(grades: pd.Series, rows: int, with_pass: bool) -> dict:
+    """Running aggregates of one scope over a batch of rows."""
+    grades = pd.to_numeric(grades, errors="coerce").dropna().astype("float64")
+    return {
+        "n_rows": rows,
+        "n_graded": len(grades),
+        "total": float(grades.sum()),
+        "sum_sq": float((grades * grades).sum()),
+        "min_grade": float(grades.min()) if len(grades) else None,
+        "max_grade": float(grades.max()) if len(grades) else None,
+        "n_pass": int((grades >= PASS_MARK).sum()) if with_pass else None,
+    }
+
+
+def _scopes(columns, added: pd.DataFrame, removed: pd.DataFrame):
+    """``(scope, name, grade column, department filter)`` touched by a delta."""
+    if "overall_grade" in columns:
+        yield "overall", "overall_grade", "overall_grade", None
+        if "department" in columns:
+            depts = pd.concat([added["department"], removed["department"]]).dropna().unique()
+            for dept in depts:
+                yield "department", dept, "overall_grade", dept
+    for col in EXAM_COLUMNS:
+        if col in columns:
+            yield "exam", col, col, None
+
+
+def _extreme(conn, table_name: str, col: str, dept, pick, stored, plus, minus):
+    """A scope's min (``pick=min``) or max after a delta."""
+    if minus is not None and stored is not None and pick(minus, stored) == minus:
+        # A removed row held the extreme; it stands while another row has it.
+        where = "AND department = :dept" if dept is not None else ""
+        params = {"value": stored, "dept": dept}
+        held = conn.execute(text(
+            f"SELECT 1 FROM [{table_name}] WHERE [{col}] = :value {where} LIMIT 1"
+        ), params).fetchone()
+        if held is None:
+            # Read it back (indexed for overall_grade); the table already holds the delta.
+            return conn.execute(text(
+                f"SELECT {'MIN' if pick is min else 'MAX'}([{col}]) FROM [{table_name}] "
+                f"WHERE [{col}] IS NOT NULL {where}"
+            ), params).scalar()
+    values = [v for v in (stored, plus) if v is not None]
+    return pick(values) if values else None
+
+
+def apply_summary_delta(conn, table_name: str, columns, removed: list, added: list):
+    """Fold replaced (``removed``) and inserted (``added``) rows into the summary.
+
+    ``removed`` and ``added`` are row tuples in ``columns`` order, and the
+    table must already hold its new rows. Costs O(len(removed) + len(added));
+    a min/max is read back from the table only when a removed row held it
+    and no other row shares the value.
+    """
+    columns = list(columns)
+    target = summary_table(table_name)
+    added = pd.DataFrame(added, columns=columns)
+    removed = pd.DataFrame(removed, columns=columns)
+    stored = {
+        (row.scope, row.name): row._asdict()
+        for row in conn.execute(text(f"SELECT * FROM [{target}] WHERE scope != 'meta'"))
+    }
+
+    if "course" in columns and not added.empty:
+        conn.execute(text(
+            f"INSERT INTO [{target}] (scope, name, label) SELECT 'meta', 'course', :course "
+            f"WHERE NOT EXISTS (SELECT 1 FROM [{target}] WHERE scope = 'meta' AND name = 'course')"
+        ), {"course": added["course"].iloc[0]})
+
+    for scope, name, col, dept in _scopes(columns, added, removed):
+        with_pass = scope != "exam"
+        if dept is None:
+            plus = _partial(added[col], len(added), with_pass)
+            minus = _partial(removed[col], len(removed), with_pass)
+        else:
+            plus = _partial(added.loc[added["department"] == dept, col], 0, with_pass)
+            plus["n_rows"] = int((added["department"] == dept).sum())
+            minus = _partial(removed.loc[removed["department"] == dept, col], 0, with_pass)
+            minus["n_rows"] = int((removed["department"] == dept).sum())
+
+        old = stored.get((scope, name))
+        base = old or {}
+        row = {"scope": scope, "name": name, "label": None}
+        for key in ("n_rows", "n_graded", "total", "sum_sq", "n_pass"):
+            row[key] = (base.get(key) or 0) + plus[key] - minus[key] if plus[key] is not None else None
+        if not row["n_graded"]:
+            row["total"] = row["sum_sq"] = None
+        row["min_grade"] = _extreme(conn, table_name, col, dept, min, base.get("min_grade"),
+                                    plus["min_grade"], minus["min_grade"])
+        row["max_grade"] = _extreme(conn, table_name, col, dept, max, base.get("max_grade"),
+                                    plus["max_grade"], minus["max_grade"])
+
+        if old is None:
+            conn.execute(text(
+                f"INSERT INTO [{target}] VALUES (:scope, :name, :label, :n_rows, :n_graded, "
+                ":total, :sum_sq, :min_grade, :max_grade, :n_pass)"
+            ), row)
+        elif scope == "department" and row["n_rows"] <= 0:
+            conn.execute(text(
+                f"DELETE FROM [{target}] WHERE scope = 'department' AND name = :name"
+            ), {"name": name})
+        else:
+            conn.execute(text(
+                f"UPDATE [{target}] SET n_rows = :n_rows, n_graded = :n_graded, total = :total, "
+                "sum_sq = :sum_sq, min_grade = :min_grade, max_grade = :max_grade, n_pass = :n_pass "
+                "WHERE scope = :scope AND name = :name"
+            ), row)
+
+
+def read_summary(conn, table_name: str):
+    target = summary_table(table_name)
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :t"), {"t": target}
+    ).fetchone()
+    if not exists:
+        return None
+    return DatasetSummary(pd.read_sql_query(text(f"SELECT * FROM [{target}]"), conn))
+
+
+def summary_from_frame(df: pd.DataFrame) -> DatasetSummary:
+    """Same aggregates computed in pandas, for tables without a stored summary."""
+    rows = [("meta", "pass_mark", None, None, None, PASS_MARK, None, None, None, None)]
+    if "course" in df.columns and not df.empty:
+        rows.append(("meta", "course", str(df["course"].iloc[0]), None, None, None, None, None, None, None))
+
+    def stats(grades: pd.Series):
+        return (len(grades), grades.count(), grades.sum(), (grades * grades).sum(),
+                grades.min(), grades.max(), int((grades >= PASS_MARK).sum()))
+
+    if "overall_grade" in df.columns:
+        rows.append(("overall", "overall_grade", None, *stats(df["overall_grade"])))
+        if "department" in df.columns:
+            for dept, grades in df.groupby("department")["overall_grade"]:
+                rows.append(("department", dept, None, *stats(grades)))
+
+    for col in EXAM_COLUMNS:
+        if col in df.columns:
+            rows.append(("exam", col, None, *stats(df[col])[:6], None))
+
+    return DatasetSummary(pd.DataFrame(rows, columns=SUMMARY_COLUMNS))
@@ -0,0 +1,180 @@
+"""Per-stage timing hooks.
+
+Wrap a stage of work in ``stage(name)``:
+
+    with stage("load.sql"):
+        df = pd.read_sql_query(...)
+
+When profiling is off (the default) ``stage`` hands back one shared no-op
+context manager, so a hook costs a function call and an attribute check.
+Profiling is on for every thread with ``SAVEETHA_PROFILE=1``; otherwise a
+session opts in (the app's ``?perf=1``) and ``begin_rerun`` turns it on for
+that session's reruns only, on the thread running them. When on, each
+stage's duration is recorded:
+
+* in the current rerun's breakdown (per thread, reset by ``begin_rerun``),
+* in a rolling window per stage (last ``WINDOW`` samples) for p50/p95,
+* in process-wide count/sum totals for the Prometheus export.
+
+``prometheus_text()`` renders the metrics in the Prometheus text format;
+they can be written to ``SAVEETHA_METRICS_FILE`` after every rerun and/or
+served on ``127.0.0.1:SAVEETHA_METRICS_PORT`` (``/metrics``).
+"""
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from services.config import METRICS_FILE, METRICS_PORT, PROFILE
+
+WINDOW = 200
+
+_lock = threading.Lock()
+_windows = {}        # stage -> deque of recent durations (seconds)
+_totals = {}         # stage -> [count, sum]
+_local = threading.local()     # per script thread: enabled, breakdown
+_server = None
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enabled() -> bool:
+    """Whether stages on this thread are timed."""
+    return getattr(_local, "enabled", PROFILE)
+
+
+def stage(name: str):
+    """Context manager timing ``name``; a shared no-op while profiling is off."""
+    return _Stage(name) if getattr(_local, "enabled", PROFILE) else _NULL_STAGE
+
+
+def record(name: str, seconds: float):
+    breakdown = getattr(_local, "breakdown", None)
+    if breakdown is not None:
+        breakdown.append((name, seconds))
+    with _lock:
+        window = _windows.get(name)
+        if window is None:
+            window = _windows[name] = deque(maxlen=WINDOW)
+            _totals[name] = [0, 0.0]
+        window.append(seconds)
+        totals = _totals[name]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+def begin_rerun(session_opt_in: bool = False):
+    """Start the rerun running on this thread, timed if profiling is on for
+    the process or the session opted in; starts a fresh breakdown."""
+    _local.enabled = PROFILE or bool(session_opt_in)
+    _local.breakdown = [] if _local.enabled else None
+
+
+def rerun_breakdown() -> list:
+    """``(stage, seconds)`` pairs recorded so far in this thread's rerun."""
+    return list(getattr(_local, "breakdown", None) or [])
+
+
+def percentiles() -> list:
+    """``(stage, count, p50, p95)`` over each stage's rolling window."""
+    with _lock:
+        windows = {name: np.fromiter(window, dtype="float64") for name, window in _windows.items()}
+    return [
+        (name, len(samples), float(np.percentile(samples, 50)), float(np.percentile(samples, 95)))
+        for name, samples in sorted(windows.items())
+    ]
+
+
+def reset():
+    with _lock:
+        _windows.clear()
+        _totals.clear()
+
+
+# ─────────────────────────────────────────────────────
+# Prometheus export
+# ─────────────────────────────────────────────────────
+def prometheus_text() -> str:
+    with _lock:
+        totals = {name: tuple(values) for name, values in _totals.items()}
+    lines = [
+        "# HELP saveetha_stage_seconds Time spent per dashboard stage.",
+        "# TYPE saveetha_stage_seconds summary",
+    ]
+    for name, count, p50, p95 in percentiles():
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'saveetha_stage_seconds{{stage="{label}",quantile="0.5"}} {p50:.6f}')
+        lines.append(f'saveetha_stage_seconds{{stage="{label}",quantile="0.95"}} {p95:.6f}')
+        lines.append(f'saveetha_stage_seconds_sum{{stage="{label}"}} {totals[name][1]:.6f}')
+        lines.append(f'saveetha_stage_seconds_count{{stage="{label}"}} {totals[name][0]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str = METRICS_FILE):
+    """Write the metrics atomically (for node_exporter's textfile collector)."""
+    if not path or not enabled():
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port: int = METRICS_PORT):
+    """Serve ``/metrics`` on localhost, once per process (no-op if ``port`` is 0)."""
+    global _server
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        except OSError:
+            # Another process (e.g. a second Streamlit worker) owns the port.
+            return None
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
@@ -0,0 +1,73 @@
+"""Persisted per-table data versions.
+
+Unlike the in-process cache generations, these live in the database itself
+(``__table_versions``), so they survive restarts and tell whether an
+on-disk artifact (such as an Arrow snapshot) was built from the current rows.
+Versions only ever go up — a deleted and re-uploaded table never reuses
+an old number.
+
+Versions do start again at 1 in a new database file, so artifacts kept
+outside it are stamped with ``database_id`` as well.
+"""
+import uuid
+
+from sqlalchemy import text
+
+VERSIONS_TABLE = "__table_versions"
+DATABASE_TABLE = "__database"
+
+
+def get_version(conn, table_name: str) -> int:
+    _ensure_versions(conn)
+    version = conn.execute(
+        text(f"SELECT version FROM {VERSIONS_TABLE} WHERE table_name = :t"), {"t": table_name}
+    ).scalar()
+    return version or 0
+
+
+def all_versions(conn) -> dict:
+    """``{table: version}`` for every table that has ever been written."""
+    _ensure_versions(conn)
+    return dict(conn.execute(text(f"SELECT table_name, version FROM {VERSIONS_TABLE}")).fetchall())
+
+
+def database_id(conn) -> str:
+    """Random id of this database file; ``""`` until its first write.
+
+    A plain read, so load paths never wait for the write lock.
+    """
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :t"),
+        {"t": DATABASE_TABLE},
+    ).fetchone()
+    if not exists:
+        return ""
+    return conn.execute(text(f"SELECT id FROM {DATABASE_TABLE}")).scalar() or ""
+
+
+def bump_version(conn, table_name: str) -> int:
+    _ensure_versions(conn)
+    _ensure_database_id(conn)
+    conn.execute(text(
+        f"INSERT INTO {VERSIONS_TABLE} (table_name, version, updated_at) "
+        "VALUES (:t, 1, CURRENT_TIMESTAMP) "
+        "ON CONFLICT(table_name) DO UPDATE SET "
+        "version = version + 1, updated_at = CURRENT_TIMESTAMP"
+    ), {"t": table_name})
+    return get_version(conn, table_name)
+
+
+def _ensure_versions(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} ("
+        "table_name TEXT PRIMARY KEY, version INTEGER NOT NULL, updated_at TEXT)"
+    ))
+
+
+def _ensure_database_id(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DATABASE_TABLE} ("
+        "singleton INTEGER PRIMARY KEY CHECK (singleton = 1), id TEXT NOT NULL)"
+    ))
+    conn.execute(text(f"INSERT OR IGNORE INTO {DATABASE_TABLE} VALUES (1, :id)"),
+                 {"id": uuid.uuid4().hex})
@@ -0,0 +1,141 @@
+"""Write coordination between threads and server processes.
+
+SQLite allows one writer at a time. Inside one process the ingest queue
+already serializes uploads, but several server processes behind a load
+balancer each have their own queue, and their uploads interleave batch by
+batch, racing on table creation and running into "database is locked".
+
+* ``writer_lock()`` is a single-writer lock held for a whole upload or
+  delete: a thread lock within the process plus an advisory lock on
+  ``<DB_PATH>.write-lock`` across processes, acquired with backoff. It is
+  reentrant, so a failed upload can still delete its half-created table.
+* ``retry_locked(fn)`` reruns a write transaction that still failed with
+  "database is locked" (a busy timeout that expired, or a snapshot that
+  another writer invalidated) with exponential backoff and jitter.
+* ``no_wait(conn)`` makes an optional write on a read path (such as
+  storing bins computed on first use) fail at once instead of waiting out
+  the busy timeout behind an upload.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy.exc import OperationalError
+
+from services.config import DB_PATH, WRITE_LOCK_TIMEOUT, WRITE_RETRIES
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_PATH = f"{DB_PATH}.write-lock"
+
+# Backoff between attempts: BASE_DELAY, doubling up to MAX_DELAY, with jitter
+# so that waiting processes do not retry in lockstep.
+BASE_DELAY = 0.05
+MAX_DELAY = 2.0
+
+
+class WriteLockTimeout(TimeoutError):
+    pass
+
+
+_thread_lock = threading.RLock()
+_depth = 0       # writer_lock nesting of the owning thread
+_lock_file = None
+
+
+@contextmanager
+def writer_lock(timeout: float = None):
+    """Hold the database's single-writer lock for the duration of the block."""
+    global _depth, _lock_file
+    timeout = WRITE_LOCK_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    if not _thread_lock.acquire(timeout=max(timeout, 0)):
+        raise WriteLockTimeout(f"another upload is still writing (waited {timeout:.0f}s)")
+    try:
+        if _depth == 0:
+            _lock_file = _acquire_file(deadline, timeout)
+        _depth += 1
+        try:
+            yield
+        finally:
+            _depth -= 1
+            if _depth == 0:
+                _release_file(_lock_file)
+                _lock_file = None
+    finally:
+        _thread_lock.release()
+
+
+def retry_locked(fn, retries: int = None):
+    """``fn()``, rerun with backoff while SQLite reports the database as locked."""
+    retries = WRITE_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except OperationalError as e:
+            if attempt == retries or not is_locked_error(e):
+                raise
+            time.sleep(backoff(attempt))
+
+
+@contextmanager
+def no_wait(conn):
+    """Within the block, statements that need the write lock fail at once if it is held."""
+    previous = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+    conn.exec_driver_sql("PRAGMA busy_timeout = 0")
+    try:
+        yield
+    finally:
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {int(previous)}")
+
+
+def is_locked_error(exc: Exception) -> bool:
+    message = str(getattr(exc, "orig", exc)).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def backoff(attempt: int) -> float:
+    return min(BASE_DELAY * 2 ** attempt, MAX_DELAY) * random.uniform(0.5, 1.0)
+
+
+# ── internals ──────────────────────────────────────
+def _acquire_file(deadline: float, timeout: float):
+    lock_file = open(LOCK_PATH, "a+b")
+    attempt = 0
+    while not _try_lock(lock_file):
+        if time.monotonic() >= deadline:
+            lock_file.close()
+            raise WriteLockTimeout(
+                f"another process is still writing to {DB_PATH} (waited {timeout:.0f}s)"
+            )
+        time.sleep(min(backoff(attempt), max(deadline - time.monotonic(), 0)))
+        attempt += 1
+    return lock_file
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:  # pragma: no cover - Windows
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _release_file(lock_file):
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        else:  # pragma: no cover - Windows
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        lock_file.close()
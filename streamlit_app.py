@@ -1,55 +1,20 @@
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from sqlalchemy import create_engine, inspect, text, Table, Column, MetaData, String
-
-from services.excel_processor import process_student_excel
-
-# ─────────────────────────────────────────────────────
-# Database (SQLite — direct access, no API server)
-# ─────────────────────────────────────────────────────
-DB_PATH = "saveetha.db"
-DATABASE_URL = f"sqlite:///./{DB_PATH}"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-
-
-def db_get_tables():
-    return inspect(engine).get_table_names()
-
-
-def db_get_all_data(table_name: str) -> pd.DataFrame:
-    try:
-        return pd.read_sql_table(table_name, engine)
-    except Exception:
-        return pd.DataFrame()
-
-
-def db_get_student(table_name: str, roll_no: str):
-    try:
-        query = text(f"SELECT * FROM {table_name} WHERE roll_no_ = :roll")
-        with engine.connect() as conn:
-            result = conn.execute(query, {"roll": roll_no})
-            row = result.fetchone()
-        if row:
-            return dict(row._mapping)
-    except Exception:
-        pass
-    return None
-
-
-def db_upload(df: pd.DataFrame, table_name: str):
-    metadata = MetaData()
-    columns = [Column(col, String) for col in df.columns]
-    Table(table_name, metadata, *columns)
-    metadata.create_all(engine)
-    df.to_sql(table_name, engine, if_exists="append", index=False)
-
-
-def db_delete_table(table_name: str):
-    with engine.connect() as conn:
-        conn.execute(text(f"DROP TABLE IF EXISTS [{table_name}]"))
-        conn.commit()
+from services.database import (
+    db_get_tables, db_search_students, db_get_student, db_delete_table,
+    db_get_summary, db_query_students, db_count_students, db_distinct_values,
+    db_get_histogram, db_get_columns, db_row_count, db_compare_cohorts, db_memory_report,
+    db_department_breakdown, COHORTS_KEY,
+)
+from services.figures import cached_figure
+from services.ingest_worker import submit_upload, submit_batch, get_jobs
+from services.student_query import StudentQuery
+from services import timing
+from services.timing import stage
 
 
 # ─────────────────────────────────────────────────────
@@ -62,6 +27,13 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Opt-in profiling: SAVEETHA_PROFILE=1 for every session, or ?perf=1 for
+# this session only (?perf=0 turns it back off).
+if "perf" in st.query_params:
+    st.session_state["perf"] = st.query_params["perf"] == "1"
+timing.begin_rerun(st.session_state.get("perf", False))
+_rerun_started = time.perf_counter()
+
 # ─────────────────────────────────────────────────────
 # Color Palette
 # ─────────────────────────────────────────────────────
@@ -91,6 +63,20 @@ PLOTLY_LAYOUT = dict(
     title_font_color="#ffffff",
 )
 
+DEPARTMENTS_PER_PAGE = 6
+
+
+def binned_histogram(counts, edges, x_title, color, title):
+    """Histogram drawn from precomputed bin counts (no raw rows in the figure)."""
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts, width=edges[1:] - edges[:-1],
+        marker_color=color, marker_line_width=0, opacity=0.85,
+        hovertemplate=f"{x_title}=%{{x}}<br>count=%{{y}}<extra></extra>",
+    ))
+    fig.update_layout(**PLOTLY_LAYOUT, title=title, bargap=0,
+                      xaxis_title=x_title, yaxis_title="count")
+    return fig
+
 # ─────────────────────────────────────────────────────
 # Custom CSS
 # ─────────────────────────────────────────────────────
@@ -177,6 +163,36 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+def _active_uploads() -> bool:
+    return any(job.active for job in get_jobs(st.session_state.get("ingest_jobs", [])))
+
+
+# Polls only while this session has an upload in flight.
+@st.fragment(run_every=1 if _active_uploads() else None)
+def upload_progress():
+    finished = st.session_state.setdefault("ingest_finished", set())
+    for job in get_jobs(st.session_state.get("ingest_jobs", [])):
+        if job.active:
+            eta = f" · ETA {job.eta_seconds:.0f}s" if job.eta_seconds is not None else ""
+            total = f"/{job.rows_total:,}" if job.rows_total else ""
+            st.progress(job.fraction, text=(
+                f"⏳ {job.file_name}: {job.rows_parsed:,}{total} parsed · "
+                f"{job.rows_written:,} written{eta}"
+            ))
+        elif job.job_id not in finished:
+            finished.add(job.job_id)
+            if job.details is not None:
+                st.session_state["upload_report"] = job.details
+            if job.status == "done":
+                st.session_state["upload_msg"] = f"✅ Uploaded **{job.table_name}** — {job.message}"
+            elif job.status == "skipped":
+                st.session_state["upload_msg"] = f"⏭️ **{job.file_name}** is {job.message} — skipped"
+            else:
+                st.session_state["upload_error"] = f"❌ Upload failed: {job.message}"
+            # New or changed table: refresh the dataset list and views.
+            st.rerun(scope="app")
+
+
 # ═════════════════════════════════════════════════════
 #  SIDEBAR
 # ═════════════════════════════════════════════════════
@@ -187,31 +203,57 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("#### 📤 Upload Dataset")
 
-    uploaded_file = st.file_uploader(
-        "Upload an Excel (.xlsx) file",
-        type=["xlsx"],
-        label_visibility="collapsed",
-        key="excel_uploader",
-    )
+    batch_mode = st.toggle("Batch import (many files)", key="batch_mode")
 
-    if uploaded_file is not None:
-        # Use session state to prevent re-uploading on every rerun
-        file_id = f"{uploaded_file.name}_{uploaded_file.size}"
-        if st.session_state.get("last_uploaded") != file_id:
-            with st.spinner("⏳ Processing upload..."):
-                try:
-                    import os
-                    df_upload = process_student_excel(uploaded_file)
-                    table_name = os.path.splitext(uploaded_file.name)[0].lower().replace(" ", "_")
-                    db_upload(df_upload, table_name)
-                    st.session_state["last_uploaded"] = file_id
-                    st.session_state["upload_msg"] = f"✅ Uploaded **{table_name}** — {len(df_upload)} rows"
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Upload failed: {e}")
+    if batch_mode:
+        batch_files = st.file_uploader(
+            "Upload Excel (.xlsx) files",
+            type=["xlsx"],
+            accept_multiple_files=True,
+            label_visibility="collapsed",
+            key="batch_uploader",
+        )
+        batch_table = st.text_input("Dataset name", placeholder="e.g. semester_2026",
+                                    key="batch_table")
+        if st.button("📥 Import all", use_container_width=True,
+                     disabled=not (batch_files and batch_table.strip())):
+            job = submit_batch(
+                [(f.name, f.getvalue()) for f in batch_files],
+                batch_table.strip().lower().replace(" ", "_"),
+            )
+            st.session_state.setdefault("ingest_jobs", []).append(job.job_id)
+            # Rerun so that upload_progress is defined with polling on.
+            st.rerun()
+    else:
+        uploaded_file = st.file_uploader(
+            "Upload an Excel (.xlsx) file",
+            type=["xlsx"],
+            label_visibility="collapsed",
+            key="excel_uploader",
+        )
+
+        if uploaded_file is not None:
+            # Use session state to prevent re-uploading on every rerun
+            file_id = uploaded_file.file_id
+            if st.session_state.get("last_uploaded") != file_id:
+                import os
+                table_name = os.path.splitext(uploaded_file.name)[0].lower().replace(" ", "_")
+                # Parsing and writing run in the background; datasets stay browsable.
+                job = submit_upload(uploaded_file.getvalue(), uploaded_file.name, table_name)
+                st.session_state.setdefault("ingest_jobs", []).append(job.job_id)
+                st.session_state["last_uploaded"] = file_id
+                # Rerun so that upload_progress is defined with polling on.
+                st.rerun()
+
+    upload_progress()
 
     if st.session_state.get("upload_msg"):
         st.success(st.session_state.pop("upload_msg"))
+    if st.session_state.get("upload_error"):
+        st.error(st.session_state.pop("upload_error"))
+    if st.session_state.get("upload_report") is not None:
+        with st.expander("📄 Import report"):
+            st.dataframe(st.session_state.pop("upload_report"), hide_index=True)
 
     st.markdown("---")
     st.markdown("#### 📂 Datasets")
@@ -250,37 +292,21 @@ with st.sidebar:
 # ═════════════════════════════════════════════════════
 #  LOAD DATA
 # ═════════════════════════════════════════════════════
-df = db_get_all_data(selected_table)
+with stage("load"):
+    summary = db_get_summary(selected_table)
+    columns = db_get_columns(selected_table)
+    row_count = db_row_count(selected_table)
 
-if df.empty:
+if not row_count:
     st.warning("No data available for this table.")
     st.stop()
 
-# clean column names
-df.columns = (
-    df.columns.str.strip()
-    .str.lower()
-    .str.replace(" ", "_")
-    .str.replace("\n", "")
-)
-
-# numeric conversion
-for col in ["grade_q1", "grade_q2", "grade_q3", "overall_grade"]:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-# pass / fail
-if "overall_grade" in df.columns:
-    df["result"] = df["overall_grade"].apply(
-        lambda x: "Pass" if pd.notna(x) and x >= 60 else "Fail"
-    )
-
 
 # ═════════════════════════════════════════════════════
 #  HEADER
 # ═════════════════════════════════════════════════════
 display_name = selected_table.replace("_", " ").title()
-course_name = str(df["course"].iloc[0]) if "course" in df.columns and not df.empty else "—"
+course_name = summary.course
 
 st.markdown(f"""
 <div style="margin-bottom: 0.5rem;">
@@ -299,12 +325,13 @@ st.markdown(f"""
 # ═════════════════════════════════════════════════════
 #  KPI CARDS
 # ═════════════════════════════════════════════════════
-if "overall_grade" in df.columns:
-    total = len(df)
-    avg = round(df["overall_grade"].mean(), 1)
-    top = df["overall_grade"].max()
-    low = df["overall_grade"].min()
-    pass_rate = round((df["result"] == "Pass").mean() * 100, 1) if "result" in df.columns else "—"
+if summary.has_grades:
+    kpis = summary.kpis()
+    total = kpis["total"]
+    avg = kpis["avg"]
+    top = kpis["top"]
+    low = kpis["low"]
+    pass_rate = kpis["pass_rate"]
 
     c1, c2, c3, c4, c5 = st.columns(5)
 
@@ -328,152 +355,240 @@ st.markdown('<div class="custom-divider"></div>', unsafe_allow_html=True)
 
 
 # ═════════════════════════════════════════════════════
-#  TABS
+#  FIGURES
 # ═════════════════════════════════════════════════════
-tab_overview, tab_departments, tab_students = st.tabs([
-    "📈  Overview", "🏫  Departments", "🔍  Students"
-])
+# Built through ``draw``, once per table generation (services.figures).
+EXAM_LABELS = {"grade_q1": "Q1 (out of 100)", "grade_q2": "Q2 (out of 100)",
+               "grade_q3": "Q3 (out of 100)"}
+
+
+def draw(table_name: str, chart_id: str, build):
+    fig = cached_figure(table_name, chart_id, build)
+    if fig is not None:
+        st.plotly_chart(fig, width="stretch")
+
+
+def dept_avg_figure(dept_stats):
+    dept_avg = dept_stats[["department", "overall_grade"]]
+    dept_avg = dept_avg.sort_values("overall_grade", ascending=True)
+    fig = px.bar(
+        dept_avg, x="overall_grade", y="department",
+        orientation="h", color="overall_grade",
+        color_continuous_scale=["#6c63ff", "#00d4aa"],
+        title="Department Wise Average",
+    )
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, coloraxis_showscale=False)
+    return fig
+
+
+def pass_fail_figure(kpis):
+    counts = pd.DataFrame({
+        "Result": ["Pass", "Fail"],
+        "Count": [kpis["passed"], kpis["failed"]],
+    })
+    counts = counts[counts["Count"] > 0].sort_values("Count", ascending=False)
+    fig = px.pie(
+        counts, names="Result", values="Count", title="Pass vs Fail",
+        color_discrete_sequence=[COLORS["accent2"], COLORS["accent3"]], hole=0.45,
+    )
+    fig.update_layout(**PLOTLY_LAYOUT)
+    fig.update_traces(textposition="inside", textinfo="percent+label", textfont_size=13)
+    return fig
+
+
+def dept_pass_figure(dept_stats):
+    dept_pass = dept_stats[dept_stats["passed"] > 0][["department", "passed"]]
+    dept_pass.columns = ["Department", "Count"]
+    dept_pass = dept_pass.sort_values("Count", ascending=False)
+    fig = px.pie(
+        dept_pass, names="Department", values="Count",
+        title="Pass by Department",
+        color_discrete_sequence=CHART_COLORS, hole=0.45,
+    )
+    fig.update_layout(**PLOTLY_LAYOUT)
+    fig.update_traces(textposition="inside", textinfo="percent+label", textfont_size=12)
+    return fig
+
+
+def dept_fail_figure(dept_stats):
+    dept_fail = dept_stats[dept_stats["failed"] > 0][["department", "failed"]]
+    dept_fail.columns = ["Department", "Count"]
+    dept_fail = dept_fail.sort_values("Count", ascending=False)
+    if not dept_fail.empty:
+        fig = px.pie(
+            dept_fail, names="Department", values="Count",
+            title="Fail by Department",
+            color_discrete_sequence=CHART_COLORS[::-1], hole=0.45,
+        )
+    else:
+        fig = go.Figure()
+        fig.add_annotation(text="No failures 🎉", showarrow=False,
+                           font=dict(size=18, color="#00d4aa"))
+        fig.update_layout(title="Fail by Department")
+    fig.update_layout(**PLOTLY_LAYOUT)
+    return fig
+
+
+def exam_comparison_figure(means):
+    fig = go.Figure()
+    for i, gc in enumerate(means.index):
+        fig.add_trace(go.Bar(
+            name=EXAM_LABELS.get(gc, gc), x=[EXAM_LABELS.get(gc, gc)], y=[means[gc]],
+            marker_color=CHART_COLORS[i + 3],
+            text=[f"{means[gc]:.1f}"], textposition="outside",
+        ))
+    fig.update_layout(
+        **PLOTLY_LAYOUT, title="Exam Performance Comparison",
+        showlegend=False, barmode="group", yaxis_title="Average Score",
+    )
+    return fig
+
+
+def radar_figure(grade_data):
+    categories = list(grade_data.keys())
+    values = list(grade_data.values())
+    categories.append(categories[0])
+    values.append(values[0])
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=values, theta=categories, fill="toself",
+        fillcolor="rgba(108,99,255,0.2)",
+        line_color=COLORS["accent"], name="Score",
+    ))
+    fig.update_layout(
+        **PLOTLY_LAYOUT, title="Exam Performance Radar",
+        polar=dict(
+            bgcolor="rgba(0,0,0,0)",
+            radialaxis=dict(visible=True, range=[0, 100], gridcolor="#2a3050"),
+            angularaxis=dict(gridcolor="#2a3050"),
+        ),
+    )
+    return fig
+
+
+def compare_depts_figure(comparison):
+    dept_long = comparison.departments.melt(
+        id_vars="department", var_name="dataset", value_name="overall_grade",
+    ).dropna()
+    if dept_long.empty:
+        return None
+    fig = px.bar(
+        dept_long, x="overall_grade", y="department", color="dataset",
+        orientation="h", barmode="group",
+        color_discrete_sequence=CHART_COLORS,
+        title="Department Averages Side by Side",
+    )
+    fig.update_layout(**PLOTLY_LAYOUT)
+    return fig
+
+
+def compare_shift_figure(comparison):
+    edges = comparison.edges
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig = go.Figure()
+    for i, dataset in enumerate(comparison.datasets):
+        fig.add_trace(go.Scatter(
+            x=centers, y=comparison.shares[dataset], mode="lines+markers",
+            name=dataset, line=dict(color=CHART_COLORS[i % len(CHART_COLORS)], shape="spline"),
+        ))
+    fig.update_layout(
+        **PLOTLY_LAYOUT, title="Grade Distribution Shift",
+        xaxis_title="overall_grade", yaxis_title="% of students",
+    )
+    return fig
 
 
 # ─────────────────────────────────────────────────────
-#  TAB 1 — OVERVIEW
+#  VIEW 1 — OVERVIEW
 # ─────────────────────────────────────────────────────
-with tab_overview:
+def overview_view():
+    dept_stats = summary.departments()
 
     col1, col2 = st.columns(2)
 
-    with col1:
-        if "overall_grade" in df.columns:
-            fig = px.histogram(
-                df, x="overall_grade", nbins=20,
-                color_discrete_sequence=[COLORS["accent"]],
+    with col1, stage("chart.overall_hist"):
+        if summary.has_grades:
+            draw(selected_table, "overall_hist", lambda: binned_histogram(
+                *db_get_histogram(selected_table, "overall_grade", 20),
+                x_title="overall_grade", color=COLORS["accent"],
                 title="Overall Grade Distribution",
-            )
-            fig.update_layout(**PLOTLY_LAYOUT)
-            fig.update_traces(marker_line_width=0, opacity=0.85)
-            st.plotly_chart(fig, width="stretch")
-
-    with col2:
-        if "department" in df.columns and "overall_grade" in df.columns:
-            dept_avg = df.groupby("department")["overall_grade"].mean().reset_index()
-            dept_avg = dept_avg.sort_values("overall_grade", ascending=True)
-            fig = px.bar(
-                dept_avg, x="overall_grade", y="department",
-                orientation="h", color="overall_grade",
-                color_continuous_scale=["#6c63ff", "#00d4aa"],
-                title="Department Wise Average",
-            )
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, coloraxis_showscale=False)
-            st.plotly_chart(fig, width="stretch")
+            ))
+
+    with col2, stage("chart.dept_avg"):
+        if not dept_stats.empty:
+            draw(selected_table, "dept_avg", lambda: dept_avg_figure(dept_stats))
 
     col1, col2, col3 = st.columns(3)
 
-    with col1:
-        if "result" in df.columns:
-            counts = df["result"].value_counts().reset_index()
-            counts.columns = ["Result", "Count"]
-            fig = px.pie(
-                counts, names="Result", values="Count", title="Pass vs Fail",
-                color_discrete_sequence=[COLORS["accent2"], COLORS["accent3"]], hole=0.45,
-            )
-            fig.update_layout(**PLOTLY_LAYOUT)
-            fig.update_traces(textposition="inside", textinfo="percent+label", textfont_size=13)
-            st.plotly_chart(fig, width="stretch")
-
-    with col2:
-        if "result" in df.columns and "department" in df.columns:
-            dept_pass = df[df["result"] == "Pass"]["department"].value_counts().reset_index()
-            dept_pass.columns = ["Department", "Count"]
-            fig = px.pie(
-                dept_pass, names="Department", values="Count",
-                title="Pass by Department",
-                color_discrete_sequence=CHART_COLORS, hole=0.45,
-            )
-            fig.update_layout(**PLOTLY_LAYOUT)
-            fig.update_traces(textposition="inside", textinfo="percent+label", textfont_size=12)
-            st.plotly_chart(fig, width="stretch")
-
-    with col3:
-        if "result" in df.columns and "department" in df.columns:
-            dept_fail = df[df["result"] == "Fail"]["department"].value_counts().reset_index()
-            dept_fail.columns = ["Department", "Count"]
-            if not dept_fail.empty:
-                fig = px.pie(
-                    dept_fail, names="Department", values="Count",
-                    title="Fail by Department",
-                    color_discrete_sequence=CHART_COLORS[::-1], hole=0.45,
-                )
-            else:
-                fig = go.Figure()
-                fig.add_annotation(text="No failures 🎉", showarrow=False,
-                                   font=dict(size=18, color="#00d4aa"))
-                fig.update_layout(title="Fail by Department")
-            fig.update_layout(**PLOTLY_LAYOUT)
-            st.plotly_chart(fig, width="stretch")
+    with col1, stage("chart.pass_fail"):
+        if summary.has_grades:
+            draw(selected_table, "pass_fail", lambda: pass_fail_figure(kpis))
+
+    with col2, stage("chart.dept_pass"):
+        if not dept_stats.empty:
+            draw(selected_table, "dept_pass", lambda: dept_pass_figure(dept_stats))
+
+    with col3, stage("chart.dept_fail"):
+        if not dept_stats.empty:
+            draw(selected_table, "dept_fail", lambda: dept_fail_figure(dept_stats))
 
     # Q1, Q2, Q3
-    grade_cols = [c for c in ["grade_q1", "grade_q2", "grade_q3"] if c in df.columns]
-    if grade_cols:
+    means = summary.exam_means()
+    if not means.empty:
         st.markdown('<div class="section-header">📝 Exam Wise Distribution</div>',
                     unsafe_allow_html=True)
-        cols = st.columns(len(grade_cols))
-        labels = {"grade_q1": "Q1 (out of 100)", "grade_q2": "Q2 (out of 100)",
-                  "grade_q3": "Q3 (out of 100)"}
-        for i, gc in enumerate(grade_cols):
-            with cols[i]:
-                fig = px.histogram(
-                    df, x=gc, nbins=15, title=labels.get(gc, gc),
-                    color_discrete_sequence=[CHART_COLORS[i + 3]],
-                )
-                fig.update_layout(**PLOTLY_LAYOUT)
-                fig.update_traces(marker_line_width=0, opacity=0.85)
-                st.plotly_chart(fig, width="stretch")
-
-    # Exam comparison
-    if grade_cols:
-        means = df[grade_cols].mean()
-        fig = go.Figure()
-        for i, gc in enumerate(grade_cols):
-            fig.add_trace(go.Bar(
-                name=labels.get(gc, gc), x=[labels.get(gc, gc)], y=[means[gc]],
-                marker_color=CHART_COLORS[i + 3],
-                text=[f"{means[gc]:.1f}"], textposition="outside",
-            ))
-        fig.update_layout(
-            **PLOTLY_LAYOUT, title="Exam Performance Comparison",
-            showlegend=False, barmode="group", yaxis_title="Average Score",
-        )
-        st.plotly_chart(fig, width="stretch")
+        cols = st.columns(len(means))
+        for i, gc in enumerate(means.index):
+            with cols[i], stage(f"chart.exam_hist.{gc}"):
+                draw(selected_table, f"exam_hist:{gc}", lambda: binned_histogram(
+                    *db_get_histogram(selected_table, gc, 15),
+                    x_title=gc, color=CHART_COLORS[i + 3], title=EXAM_LABELS.get(gc, gc),
+                ))
+
+        # Exam comparison
+        with stage("chart.exam_comparison"):
+            draw(selected_table, "exam_comparison", lambda: exam_comparison_figure(means))
 
 
 # ─────────────────────────────────────────────────────
-#  TAB 2 — DEPARTMENTS
+#  VIEW 2 — DEPARTMENTS
 # ─────────────────────────────────────────────────────
-with tab_departments:
-    if "department" not in df.columns:
+def departments_view():
+    if "department" not in columns or "overall_grade" not in columns:
         st.info("No department column found.")
     else:
-        for dept in sorted(df["department"].dropna().unique()):
-            dept_df = df[df["department"] == dept]
+        with stage("groupby.departments"):
+            breakdown = db_department_breakdown(selected_table)
+        departments = breakdown.departments
+
+        # Only the current page of departments gets figures built.
+        pages = max(1, -(-len(departments) // DEPARTMENTS_PER_PAGE))
+        page = 1
+        if pages > 1:
+            page = st.number_input(
+                f"Page (of {pages}) — {len(departments)} departments",
+                min_value=1, max_value=pages, value=1, step=1,
+                key=f"dept_page_{selected_table}",
+            )
+        start = (page - 1) * DEPARTMENTS_PER_PAGE
 
+        for dept in departments[start:start + DEPARTMENTS_PER_PAGE]:
             st.markdown(f'<div class="section-header">🏫 {dept}</div>',
                         unsafe_allow_html=True)
 
             col1, col2 = st.columns([2, 1])
 
-            with col1:
-                fig = px.histogram(
-                    dept_df, x="overall_grade", nbins=15,
-                    color_discrete_sequence=[COLORS["accent"]],
+            with col1, stage("chart.dept_hist"):
+                draw(selected_table, f"dept_hist:{dept}", lambda: binned_histogram(
+                    breakdown.counts.loc[dept].to_numpy(), breakdown.edges,
+                    x_title="overall_grade", color=COLORS["accent"],
                     title=f"{dept} — Grade Distribution",
-                )
-                fig.update_layout(**PLOTLY_LAYOUT)
-                fig.update_traces(marker_line_width=0, opacity=0.85)
-                st.plotly_chart(fig, width="stretch")
+                ))
 
             with col2:
                 st.markdown("**🏅 Top 3 Students**")
-                top3 = dept_df.sort_values("overall_grade", ascending=False).head(3)
+                top3 = breakdown.top[breakdown.top["department"] == dept]
                 for rank, (_, row) in enumerate(top3.iterrows(), 1):
                     name = row.get("student_name", "—")
                     grade = row.get("overall_grade", "—")
@@ -492,85 +607,104 @@ with tab_departments:
 
 
 # ─────────────────────────────────────────────────────
-#  TAB 3 — STUDENTS
+#  VIEW 3 — STUDENTS
 # ─────────────────────────────────────────────────────
-with tab_students:
+@st.fragment
+def student_search(table_name: str):
+    # Live search: only this fragment reruns while the user types.
+    query = st.text_input(
+        "Search students",
+        placeholder="Name, roll or register number — e.g. 21CS001",
+        type="search", live="250ms",
+        label_visibility="collapsed",
+        key=f"student_search_{table_name}",
+    )
+    if not query or not query.strip():
+        return
+
+    matches = db_search_students(table_name, query)
+    if not matches:
+        st.error("❌ No matching student. Try part of the name or roll number.")
+        return
+
+    choice = st.selectbox(
+        f"{len(matches)} best matches", range(len(matches)),
+        format_func=lambda i: " · ".join(
+            str(matches[i][k]) for k in ("student_name", "roll_no_", "department")
+            if matches[i].get(k) is not None
+        ),
+        key=f"student_match_{table_name}_{query}",
+    )
+    student = matches[choice]
+
+    st.markdown('<div class="student-card">', unsafe_allow_html=True)
+    st.markdown(f"### 👤 {student.get('student_name', 'Student')}")
+
+    keys = list(student.keys())
+    mid = len(keys) // 2
+    c1, c2 = st.columns(2)
+
+    with c1:
+        for k in keys[:mid]:
+            v = student[k]
+            label = k.replace("_", " ").title()
+            st.markdown(f"""
+            <div class="student-field">
+                <span class="student-field-key">{label}</span>
+                <span class="student-field-val">{v}</span>
+            </div>""", unsafe_allow_html=True)
+    with c2:
+        for k in keys[mid:]:
+            v = student[k]
+            label = k.replace("_", " ").title()
+            st.markdown(f"""
+            <div class="student-field">
+                <span class="student-field-key">{label}</span>
+                <span class="student-field-val">{v}</span>
+            </div>""", unsafe_allow_html=True)
+
+    # Ranks come with the record in one lookup, from the table's rank index.
+    record = db_get_student(table_name, student["roll_no_"]) if student.get("roll_no_") else None
+    standings = []
+    for gc in ["overall_grade", "grade_q1", "grade_q2", "grade_q3"]:
+        if not record or record.get(f"{gc}_rank") is None:
+            continue
+        parts = [f"Rank #{record[f'{gc}_rank']:,}"]
+        if record.get(f"{gc}_dept_rank") is not None:
+            parts.append(f"Dept #{record[f'{gc}_dept_rank']:,}")
+        parts.append(f"Percentile {record[f'{gc}_percentile']:g}")
+        standings.append((f"{gc.replace('grade_', '').replace('_', ' ').title()} standing",
+                          " · ".join(parts)))
+    if standings:
+        c1, c2 = st.columns(2)
+        for i, (label, value) in enumerate(standings):
+            with (c1, c2)[i % 2]:
+                st.markdown(f"""
+                <div class="student-field">
+                    <span class="student-field-key">{label}</span>
+                    <span class="student-field-val">{value}</span>
+                </div>""", unsafe_allow_html=True)
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Radar chart
+    grade_data = {}
+    for gc in ["grade_q1", "grade_q2", "grade_q3"]:
+        if gc in student:
+            grade_data[gc.replace("grade_", "").upper()] = float(student[gc]) if student[gc] else 0
+
+    if grade_data:
+        # Keyed by the scores, so students with the same marks share a figure.
+        draw(table_name, "radar:" + ",".join(f"{k}={v:g}" for k, v in grade_data.items()),
+             lambda: radar_figure(grade_data))
+
+
+def students_view():
 
     st.markdown('<div class="section-header">🔍 Search Student</div>',
                 unsafe_allow_html=True)
 
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        roll_no = st.text_input(
-            "Roll Number",
-            placeholder="e.g. 21CS001",
-            label_visibility="collapsed",
-        )
-    with col2:
-        search_btn = st.button("🔎  Search", use_container_width=True)
-
-    if search_btn and roll_no:
-        student = db_get_student(selected_table, roll_no)
-        if student:
-            st.markdown('<div class="student-card">', unsafe_allow_html=True)
-            st.markdown(f"### 👤 {student.get('student_name', 'Student')}")
-
-            keys = list(student.keys())
-            mid = len(keys) // 2
-            c1, c2 = st.columns(2)
-
-            with c1:
-                for k in keys[:mid]:
-                    v = student[k]
-                    label = k.replace("_", " ").title()
-                    st.markdown(f"""
-                    <div class="student-field">
-                        <span class="student-field-key">{label}</span>
-                        <span class="student-field-val">{v}</span>
-                    </div>""", unsafe_allow_html=True)
-            with c2:
-                for k in keys[mid:]:
-                    v = student[k]
-                    label = k.replace("_", " ").title()
-                    st.markdown(f"""
-                    <div class="student-field">
-                        <span class="student-field-key">{label}</span>
-                        <span class="student-field-val">{v}</span>
-                    </div>""", unsafe_allow_html=True)
-
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            # Radar chart
-            grade_data = {}
-            for gc in ["grade_q1", "grade_q2", "grade_q3"]:
-                if gc in student:
-                    grade_data[gc.replace("grade_", "").upper()] = float(student[gc]) if student[gc] else 0
-
-            if grade_data:
-                categories = list(grade_data.keys())
-                values = list(grade_data.values())
-                categories.append(categories[0])
-                values.append(values[0])
-
-                fig = go.Figure()
-                fig.add_trace(go.Scatterpolar(
-                    r=values, theta=categories, fill="toself",
-                    fillcolor="rgba(108,99,255,0.2)",
-                    line_color=COLORS["accent"], name="Score",
-                ))
-                fig.update_layout(
-                    **PLOTLY_LAYOUT, title="Exam Performance Radar",
-                    polar=dict(
-                        bgcolor="rgba(0,0,0,0)",
-                        radialaxis=dict(visible=True, range=[0, 100], gridcolor="#2a3050"),
-                        angularaxis=dict(gridcolor="#2a3050"),
-                    ),
-                )
-                st.plotly_chart(fig, width="stretch")
-        else:
-            st.error("❌ Student not found. Check the Roll number.")
-    elif search_btn:
-        st.warning("Please enter a roll number.")
+    student_search(selected_table)
 
     st.markdown('<div class="custom-divider"></div>', unsafe_allow_html=True)
 
@@ -579,12 +713,154 @@ with tab_students:
                 unsafe_allow_html=True)
 
     display_cols = [c for c in ["student_name", "roll_no_", "register_no_",
-                                "department", "year", "overall_grade", "result"]
-                    if c in df.columns]
+                                "department", "year", "overall_grade", "grade_band",
+                                "result"]
+                    if c in columns]
 
     if display_cols:
-        styled_df = df[display_cols].copy()
-        styled_df.columns = [c.replace("_", " ").title() for c in display_cols]
+        # Filters, sort and paging run in SQLite; only one page is loaded.
+        key = f"grid_{selected_table}"
+        f1, f2, f3, f4 = st.columns([2, 2, 1, 2])
+        with f1:
+            dept_filter = st.multiselect(
+                "Department", db_distinct_values(selected_table, "department")
+                if "department" in columns else [], key=f"{key}_dept",
+            )
+        with f2:
+            year_filter = st.multiselect(
+                "Year", db_distinct_values(selected_table, "year")
+                if "year" in columns else [], key=f"{key}_year",
+            )
+        with f3:
+            result_filter = st.selectbox("Result", ["All", "Pass", "Fail"], key=f"{key}_result")
+        with f4:
+            grade_range = None
+            # No slider when no student is graded yet (min/max are None).
+            if summary.has_grades and pd.notna(kpis["low"]) and pd.notna(kpis["top"]):
+                low, high = float(kpis["low"]), float(kpis["top"])
+                if low < high:
+                    picked = st.slider("Overall grade", low, high, (low, high), key=f"{key}_grade")
+                    # The full range filters nothing, so ungraded students stay listed.
+                    if picked != (low, high):
+                        grade_range = picked
+
+        sortable = [c for c in display_cols if c not in ("grade_band", "result")]
+        s1, s2, s3, s4 = st.columns([2, 1, 1, 1])
+        with s1:
+            sort_by = st.selectbox(
+                "Sort by", sortable, format_func=lambda c: c.replace("_", " ").title(),
+                index=sortable.index("roll_no_") if "roll_no_" in sortable else 0,
+                key=f"{key}_sort",
+            )
+        with s2:
+            descending = st.toggle("Descending", key=f"{key}_desc")
+        with s3:
+            page_size = st.selectbox("Rows", [25, 50, 100, 250], index=1, key=f"{key}_size")
+
+        query = StudentQuery(
+            departments=dept_filter, years=year_filter,
+            result=None if result_filter == "All" else result_filter,
+            grade_min=grade_range[0] if grade_range else None,
+            grade_max=grade_range[1] if grade_range else None,
+            sort_by=sort_by, descending=descending, page_size=page_size,
+        )
+        matches = db_count_students(selected_table, query)
+        pages = max(1, -(-matches // page_size))
+        with s4:
+            # Keyed on the match count so a new filter starts back at page 1.
+            query.page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages,
+                                         value=1, step=1, key=f"{key}_page_{matches}_{page_size}")
+
+        page_df = db_query_students(selected_table, query)
+        styled_df = page_df[[c for c in display_cols if c in page_df.columns]].copy()
+        styled_df.columns = [c.replace("_", " ").title() for c in styled_df.columns]
+        first = (query.page - 1) * page_size
+        st.caption(f"Showing {min(first + 1, matches)}–{min(first + page_size, matches)} "
+                   f"of {matches} students")
         st.dataframe(styled_df, width="stretch", height=500)
     else:
         st.info("No student columns found.")
+
+
+# ─────────────────────────────────────────────────────
+#  VIEW 4 — COMPARE
+# ─────────────────────────────────────────────────────
+def compare_view():
+    # Aggregates come from SQL over the stored summaries; no dataset is loaded.
+    others = [t for t in tables if t != selected_table]
+    compared = st.multiselect(
+        "Datasets to compare (the first is the baseline)", tables,
+        default=[selected_table] + others[:1], key="compare_tables",
+    )
+
+    comparison = db_compare_cohorts(compared) if len(compared) >= 2 else None
+    if comparison is None or len(comparison.datasets) < 2:
+        st.info("Pick at least two datasets to compare." if len(compared) < 2 else
+                "Fewer than two of these datasets have typed grades to compare.")
+    else:
+        if comparison.skipped:
+            st.caption(f"Not comparable (no typed grades): {', '.join(comparison.skipped)}")
+
+        st.markdown('<div class="section-header">📊 KPIs vs '
+                    f'{comparison.baseline.replace("_", " ").title()}</div>',
+                    unsafe_allow_html=True)
+        kpi_table = comparison.kpis.round(1)
+        kpi_table.columns = [c.replace("_", " ").title() for c in kpi_table.columns]
+        st.dataframe(kpi_table, hide_index=True, width="stretch")
+
+        # Cross-table figures live under the cohorts slot, which any upload bumps.
+        compared_id = "|".join(compared)
+        col1, col2 = st.columns(2)
+        with col1, stage("chart.compare_depts"):
+            draw(COHORTS_KEY, f"compare_depts:{compared_id}",
+                 lambda: compare_depts_figure(comparison))
+
+        with col2, stage("chart.compare_shift"):
+            draw(COHORTS_KEY, f"compare_shift:{compared_id}",
+                 lambda: compare_shift_figure(comparison))
+
+
+# ═════════════════════════════════════════════════════
+#  VIEWS
+# ═════════════════════════════════════════════════════
+# Lazy tabs: a rerun executes the open tab's view only, so working in one
+# tab never rebuilds another tab's figures.
+VIEWS = {
+    "📈  Overview": ("overview", overview_view),
+    "🏫  Departments": ("departments", departments_view),
+    "🔍  Students": ("students", students_view),
+    "🔀  Compare": ("compare", compare_view),
+}
+
+for tab, (name, view) in zip(st.tabs(list(VIEWS), key="view", on_change="rerun"), VIEWS.values()):
+    if tab.open:
+        with tab, stage(f"tab.{name}"):
+            view()
+
+
+# Footprint of the shared in-memory copy, once a view has loaded it.
+memory = db_memory_report(selected_table)
+if memory is not None:
+    st.sidebar.caption(f"🧠 {selected_table} in memory: {memory.summary()}")
+
+
+# ═════════════════════════════════════════════════════
+#  PERFORMANCE PANEL (opt-in)
+# ═════════════════════════════════════════════════════
+if timing.enabled():
+    timing.record("rerun", time.perf_counter() - _rerun_started)
+    timing.write_prometheus()
+    timing.serve_metrics()
+
+    with st.sidebar, st.expander("⏱️ Performance"):
+        rerun_stages = pd.DataFrame(timing.rerun_breakdown(), columns=["stage", "ms"])
+        rerun_stages["ms"] = (rerun_stages["ms"] * 1000).round(2)
+        st.markdown("**This rerun**")
+        st.dataframe(rerun_stages, hide_index=True, width="stretch")
+
+        rolling = pd.DataFrame(timing.percentiles(), columns=["stage", "n", "p50 ms", "p95 ms"])
+        rolling[["p50 ms", "p95 ms"]] = (rolling[["p50 ms", "p95 ms"]] * 1000).round(2)
+        st.markdown(f"**Rolling (last {timing.WINDOW} per stage)**")
+        st.dataframe(rolling, hide_index=True, width="stretch")
+        st.download_button("Prometheus metrics", timing.prometheus_text(),
+                           file_name="saveetha_metrics.prom", mime="text/plain")